@@ -7,7 +7,8 @@ class Config:
     records_per_page = page_size // int_size
     pages_per_range = 16
     records_per_range = records_per_page * pages_per_range
-    range_cap = records_per_range * 2
+    segments_per_range = 2**20 # segment 0 holds base records, the rest are tail segments opened on demand
+    range_cap = records_per_range * segments_per_range
     byteorder = 'little'
     indirection_column = 0
     rid_column = 1
@@ -15,7 +16,13 @@ class Config:
     schema_encoding_column = 3
     base_rid_column = 4 # for tail records
     initial_page_ranges = 1
+    base_segment = 0
+    tail_segment = 1
     base_meta_columns = 4
     tail_meta_columns = 5
     null_value = -2**63
+    free_page_buffers = 1024 # released page buffers kept for reuse
+    merge_threshold = records_per_page # unmerged tail records in a range before a background merge
+    version_checkpoint_interval = 16 # tail records per record between snapshots of its data columns
+    index_fill_factor = 0.9 # share of each B+ tree node filled when an index is bulk loaded
     deleted_record_value = -1
\ No newline at end of file
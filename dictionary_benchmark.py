@@ -0,0 +1,40 @@
+from lstore.db import Database
+from lstore.query import Query
+from time import process_time
+from random import randrange, seed
+
+# Student Id and 4 sparse status codes, raw pages versus dictionary-encoded columns
+seed(3562901)
+rows = [[906659671 + i] + [randrange(0, 21) * 100000 for _ in range(4)] for i in range(0, 20000)]
+
+db = Database()
+for label, dictionary_columns in (("raw", None), ("dictionary", [1, 2, 3, 4])):
+    table = db.create_table('Grades_' + label, 5, 0, dictionary_columns)
+    query = Query(table)
+
+    insert_time_0 = process_time()
+    for row in rows:
+        query.insert(*row)
+    insert_time_1 = process_time()
+    print(f"[{label}] Inserting 20k records took:  \t\t", insert_time_1 - insert_time_0)
+
+    select_time_0 = process_time()
+    for i in range(0, 1000):
+        query.select(randrange(0, 21) * 100000, 1, [1, 1, 1, 1, 1])
+    select_time_1 = process_time()
+    print(f"[{label}] Selecting 1k status values took:  \t", select_time_1 - select_time_0)
+
+    agg_time_0 = process_time()
+    for i in range(0, 20000, 100):
+        query.sum(906659671 + i, 906659671 + i + 99, randrange(1, 5))
+    agg_time_1 = process_time()
+    print(f"[{label}] Aggregate 20k of 100 record batch took:", agg_time_1 - agg_time_0)
+
+    directory = table.page_directory
+    directory.compress_base_pages()
+    status_bytes = sum(
+        logical_page[column].nbytes
+        for _, _, logical_page in directory.iter_base_pages()
+        for column in range(5, 9)
+    )
+    print(f"[{label}] Compressed status column bytes:  \t", status_bytes)
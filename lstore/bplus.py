@@ -7,7 +7,25 @@ Index class uses it to map column values to record identifiers (RIDs).
 from __future__ import annotations
 
 from bisect import bisect_left, bisect_right
-from typing import Iterable, List, Optional, Sequence
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+
+def insert_sorted(bucket: List[int], value: int) -> bool:
+    """Adds value to a sorted bucket of distinct values; returns False if it was already there."""
+    index = bisect_left(bucket, value)
+    if index < len(bucket) and bucket[index] == value:
+        return False
+    bucket.insert(index, value)
+    return True
+
+
+def remove_sorted(bucket: List[int], value: int) -> bool:
+    """Removes value from a sorted bucket; returns False if it was not there."""
+    index = bisect_left(bucket, value)
+    if index == len(bucket) or bucket[index] != value:
+        return False
+    del bucket[index]
+    return True
 
 
 class _Node:
@@ -23,7 +41,11 @@ class _Node:
 
 
 class _LeafNode(_Node):
-    """Leaf node storing keys and their associated value buckets."""
+    """Leaf node storing keys and their associated value buckets.
+
+    Each bucket is a sorted list of distinct values, so membership checks,
+    inserts and removals bisect instead of scanning.
+    """
 
     def __init__(self, order: int) -> None:
         super().__init__(order)
@@ -64,9 +86,7 @@ class BPlusTree:
         idx = bisect_left(leaf.keys, key)
 
         if idx < len(leaf.keys) and leaf.keys[idx] == key:
-            bucket = leaf.values[idx]
-            if value not in bucket:
-                bucket.append(value)
+            if insert_sorted(leaf.values[idx], value):
                 self._size += 1
             return
 
@@ -111,13 +131,11 @@ class BPlusTree:
             removed = bool(bucket)
             self._size -= len(bucket)
             bucket.clear()
+        elif remove_sorted(bucket, value):
+            self._size -= 1
+            removed = True
         else:
-            try:
-                bucket.remove(value)
-                self._size -= 1
-                removed = True
-            except ValueError:
-                return False
+            return False
 
         if bucket:
             return removed
@@ -128,6 +146,70 @@ class BPlusTree:
         self._rebalance_after_delete(leaf)
         return removed
 
+    def bulk_load(self, sorted_pairs: Iterable[Tuple[int, int]], fill_factor: float = 1.0) -> None:
+        """Replaces the tree's contents with ``(key, value)`` pairs given in key order.
+
+        Leaves are packed left to right to ``fill_factor`` of their capacity and each
+        internal level is built over the one below it, so no node is ever split.
+        Nodes never drop below the minimum occupancy deletes rely on.
+        """
+        leaf_keys: List[int] = []
+        leaf_values: List[List[int]] = []
+        size = 0
+        last_key: Optional[int] = None
+        bucket: List[int] = []
+        for key, value in sorted_pairs:
+            if key != last_key:
+                if last_key is not None and key < last_key:
+                    raise ValueError("bulk_load needs pairs sorted by key")
+                last_key = key
+                bucket = [value]
+                leaf_keys.append(key)
+                leaf_values.append(bucket)
+            elif not insert_sorted(bucket, value):
+                continue
+            size += 1
+
+        self._size = size
+        self._root = _LeafNode(self.order)
+        if not leaf_keys:
+            return
+
+        per_leaf = max(self._min_leaf_keys, min(self._max_keys, round(self._max_keys * fill_factor)))
+        level: List[_Node] = []
+        first_keys: List[int] = []
+        previous: Optional[_LeafNode] = None
+        start = 0
+        for length in self._packed_lengths(len(leaf_keys), per_leaf, self._min_leaf_keys, self._max_keys):
+            leaf = _LeafNode(self.order)
+            leaf.keys = leaf_keys[start : start + length]
+            leaf.values = leaf_values[start : start + length]
+            leaf.prev = previous
+            if previous is not None:
+                previous.next = leaf
+            level.append(leaf)
+            first_keys.append(leaf.keys[0])
+            previous = leaf
+            start += length
+
+        per_node = max(self._min_internal_keys + 1, min(self.order, round(self.order * fill_factor)))
+        while len(level) > 1:
+            parents: List[_Node] = []
+            parent_first_keys: List[int] = []
+            start = 0
+            for length in self._packed_lengths(len(level), per_node, self._min_internal_keys + 1, self.order):
+                node = _InternalNode(self.order)
+                node.children = level[start : start + length]
+                node.keys = first_keys[start + 1 : start + length]
+                for child in node.children:
+                    child.parent = node
+                parents.append(node)
+                parent_first_keys.append(first_keys[start])
+                start += length
+            level, first_keys = parents, parent_first_keys
+        self._root = level[0]
+        self._root.parent = None
+
     def items(self) -> Iterable[Sequence[int]]:
         node = self._leftmost_leaf()
         while node is not None:
@@ -138,6 +220,18 @@ class BPlusTree:
     # ------------------------------------------------------------------
     # Helpers
     # ------------------------------------------------------------------
+    @staticmethod
+    def _packed_lengths(count: int, per_node: int, minimum: int, maximum: int) -> List[int]:
+        """Splits count entries into nodes of per_node, topping up an underfull last node."""
+        lengths = [per_node] * (count // per_node)
+        if count % per_node:
+            lengths.append(count % per_node)
+        if len(lengths) > 1 and lengths[-1] < minimum:
+            # Fold the last two nodes together, or share their entries evenly when that overflows.
+            combined = lengths.pop() + lengths.pop()
+            lengths += [combined] if combined <= maximum else [combined - combined // 2, combined // 2]
+        return lengths
+
     @property
     def _max_keys(self) -> int:
         return self.order - 1
@@ -331,3 +425,51 @@ class BPlusTree:
 
 # Backwards compatibility alias for existing imports in the project.
 bPlusTree = BPlusTree
+
+
+class PartitionedBPlusTree:
+    """One B+ tree per key-range partition, behind the BPlusTree interface.
+
+    ``bounds`` are the sorted partition split keys: partition ``p`` holds the keys in
+    ``[bounds[p - 1], bounds[p])``. Point operations touch one subtree and range
+    queries only the subtrees whose partitions overlap the range.
+    """
+
+    def __init__(self, bounds: Sequence[int], order: int = 32) -> None:
+        self.bounds = sorted(bounds)
+        self.partitions = [BPlusTree(order) for _ in range(len(self.bounds) + 1)]
+
+    def __len__(self) -> int:
+        return sum(len(tree) for tree in self.partitions)
+
+    def subtree(self, key: int) -> BPlusTree:
+        return self.partitions[bisect_right(self.bounds, key)]
+
+    def insert(self, key: int, value: int) -> None:
+        self.subtree(key).insert(key, value)
+
+    def find(self, key: int) -> List[int]:
+        return self.subtree(key).find(key)
+
+    def find_range(self, start: int, end: int) -> List[int]:
+        if start > end:
+            return []
+        results: List[int] = []
+        for partition in range(bisect_right(self.bounds, start), bisect_right(self.bounds, end) + 1):
+            results.extend(self.partitions[partition].find_range(start, end))
+        return results
+
+    def remove(self, key: int, value: Optional[int] = None) -> bool:
+        return self.subtree(key).remove(key, value)
+
+    def bulk_load(self, sorted_pairs: Iterable[Tuple[int, int]], fill_factor: float = 1.0) -> None:
+        pairs = list(sorted_pairs)
+        start = 0
+        for partition, tree in enumerate(self.partitions):
+            end = len(pairs) if partition == len(self.bounds) else bisect_left(pairs, (self.bounds[partition],), start)
+            tree.bulk_load(pairs[start:end], fill_factor)
+            start = end
+
+    def items(self) -> Iterable[Sequence[int]]:
+        for tree in self.partitions:
+            yield from tree.items()
@@ -0,0 +1,79 @@
+"""Byte-budgeted LRU cache of reconstructed latest record versions."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import List, Optional
+
+from config import Config
+
+
+class RowCache:
+    """Keeps the latest version of recently read records, keyed by base RID.
+
+    Entries are full records in the layout returned by
+    ``Table.get_cumulative_updated_record`` and each one is charged
+    ``Config.int_size`` bytes per column against ``max_bytes``. The least recently
+    used entries are evicted once the budget is exceeded. Callers receive and hand
+    over copies, so cached rows are never mutated from outside. Rows loaded by
+    batched fetches carry a null timestamp, as projected fetches do.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.rows: "OrderedDict[int, List[int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, rid: int) -> bool:
+        return rid in self.rows
+
+    def get(self, rid: int) -> Optional[List[int]]:
+        """Returns a copy of the cached record, or None on a miss."""
+        row = self.rows.get(rid)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.rows.move_to_end(rid)
+        return list(row)
+
+    def put(self, rid: int, row: List[int]) -> None:
+        """Caches a copy of row, evicting the least recently used rows over budget."""
+        cost = len(row) * Config.int_size
+        if cost > self.max_bytes:
+            return
+        self.invalidate(rid)
+        self.rows[rid] = list(row)
+        self.nbytes += cost
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.rows.popitem(last=False)
+            self.nbytes -= len(evicted) * Config.int_size
+
+    def apply_update(self, rid: int, tail_rid: int, schema_encoding: int, data: List[int]) -> None:
+        """Writes a new tail record through to the cached row, if there is one.
+
+        ``data`` holds the tail's data columns with ``Config.null_value`` where the
+        update left a column alone.
+        """
+        row = self.rows.get(rid)
+        if row is None:
+            return
+        row[Config.indirection_column] = tail_rid
+        row[Config.schema_encoding_column] |= schema_encoding
+        for column, value in enumerate(data):
+            if value != Config.null_value:
+                row[Config.tail_meta_columns + column] = value
+
+    def invalidate(self, rid: int) -> None:
+        row = self.rows.pop(rid, None)
+        if row is not None:
+            self.nbytes -= len(row) * Config.int_size
+
+    def clear(self) -> None:
+        self.rows.clear()
+        self.nbytes = 0
@@ -0,0 +1,34 @@
+"""Monotonic commit clock shared by every table."""
+
+from __future__ import annotations
+
+from threading import Lock
+from time import time_ns
+
+
+class CommitClock:
+    """Hands out strictly increasing commit timestamps in nanoseconds.
+
+    Timestamps follow the wall clock but never repeat or go backwards, even when
+    several commits land within one clock tick or the system clock is adjusted, so
+    the commit order of any two writes can be read off their timestamps.
+    """
+
+    def __init__(self) -> None:
+        self.last = 0
+        self._lock = Lock()
+
+    def now(self) -> int:
+        """Returns a timestamp covering every commit so far and none made after the call."""
+        with self._lock:
+            self.last = max(time_ns(), self.last)
+            return self.last
+
+    def tick(self) -> int:
+        """Returns a new commit timestamp, later than every earlier one."""
+        with self._lock:
+            self.last = max(time_ns(), self.last + 1)
+            return self.last
+
+
+commit_clock = CommitClock()
@@ -11,16 +11,32 @@ class Database():
         pass
 
     def close(self):
-        pass
+        for table in self.tables.values():
+            table.wait_for_merge()
 
     """
     # Creates a new table
     :param name: string         #Table name
     :param num_columns: int     #Number of Columns: all columns are integer
     :param key: int             #Index of table key in columns
+    :param dictionary_columns: list[int]  #Optional low-cardinality columns to dictionary encode
+    :param cumulative_tails: bool  #Whether tail records carry every column updated since their base page was last merged
+    :param row_cache_bytes: int  #Byte budget for caching latest record versions, 0 to disable
+    :param partition_bounds: list[int]  #Primary key split points to range-partition the table by, updates cannot move a key across them
     """
-    def create_table(self, name, num_columns, key_index):
-        table = Table(name, num_columns, key_index)
+    def create_table(
+        self,
+        name,
+        num_columns,
+        key_index,
+        dictionary_columns=None,
+        cumulative_tails=False,
+        row_cache_bytes=0,
+        partition_bounds=None,
+    ):
+        table = Table(
+            name, num_columns, key_index, dictionary_columns, cumulative_tails, row_cache_bytes, partition_bounds
+        )
         self.tables[name] = table
         return table
 
@@ -31,7 +47,9 @@ class Database():
     def drop_table(self, name):
         if name not in self.tables:
             raise ValueError(f"Table {name} does not exist")
-        del self.tables[name]
+        table = self.tables.pop(name)
+        table.wait_for_merge()
+        table.page_directory.release_pages()
         return True
     
     """
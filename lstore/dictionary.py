@@ -0,0 +1,60 @@
+"""Per-column dictionary encoding for low-cardinality integer columns."""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from config import Config
+
+
+class ColumnDictionary:
+    """Maps a column's distinct values to dense integer codes.
+
+    Codes are assigned in first-seen order and never reused, so pages can store
+    them in place of the values. ``histogram[code]`` counts the live records whose
+    latest version holds that code; the owning table keeps it current on insert,
+    update and delete. ``Config.null_value`` is never encoded.
+    """
+
+    def __init__(self) -> None:
+        self.values: List[int] = []
+        self.codes: Dict[int, int] = {}
+        self.histogram: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: int) -> int:
+        """Returns the code for value, assigning a new one on first sight."""
+        if value == Config.null_value:
+            return value
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+            self.histogram.append(0)
+        return code
+
+    def lookup(self, value: int) -> Optional[int]:
+        """Returns the code for value without assigning one, or None if unseen."""
+        return self.codes.get(value)
+
+    def decode(self, code: int) -> int:
+        if code == Config.null_value:
+            return code
+        return self.values[code]
+
+    def count(self, value: int) -> int:
+        """Number of live records whose latest version holds value."""
+        code = self.codes.get(value)
+        return 0 if code is None else self.histogram[code]
+
+    def record(self, code: int, delta: int) -> None:
+        if code != Config.null_value:
+            self.histogram[code] += delta
+
+    def sum_codes(self, code_counts: Dict[int, int]) -> int:
+        """Sums the values behind a {code: occurrences} histogram."""
+        values = self.values
+        return sum(values[code] * occurrences for code, occurrences in code_counts.items() if code != Config.null_value)
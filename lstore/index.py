@@ -1,64 +1,301 @@
-"""Index manager backed by a B+ tree per indexed column."""
+"""Index manager backed by B+ tree, hash and bitmap indexes on the indexed columns."""
 
 from __future__ import annotations
 
-from typing import Iterable, List, Optional, Tuple, TYPE_CHECKING
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING
 
 from config import Config
-from lstore.bplus import BPlusTree
+from lstore.bplus import BPlusTree, PartitionedBPlusTree, insert_sorted, remove_sorted
 
 if TYPE_CHECKING:
     from lstore.table import Table
 
+INDEX_TYPES = ("bplus", "hash", "bitmap")
+
+
+class HashIndex:
+    """Hash map from column value to RIDs, behind the BPlusTree interface.
+
+    Equality lookups are a single dict probe. Range queries have to visit every
+    key, so columns that serve them should keep a B+ tree as well.
+    """
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, List[int]] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, key: int, value: int) -> None:
+        if insert_sorted(self.buckets.setdefault(key, []), value):
+            self._size += 1
+
+    def find(self, key: int) -> List[int]:
+        bucket = self.buckets.get(key)
+        return list(bucket) if bucket else []
+
+    def find_range(self, start: int, end: int) -> List[int]:
+        results: List[int] = []
+        for key in sorted(key for key in self.buckets if start <= key <= end):
+            results.extend(self.buckets[key])
+        return results
+
+    def remove(self, key: int, value: Optional[int] = None) -> bool:
+        bucket = self.buckets.get(key)
+        if not bucket:
+            return False
+        if value is None:
+            self._size -= len(bucket)
+        elif remove_sorted(bucket, value):
+            self._size -= 1
+            if bucket:
+                return True
+        else:
+            return False
+        del self.buckets[key]
+        return True
+
+    def bulk_load(self, sorted_pairs: Iterable[Tuple[int, int]], fill_factor: float = 1.0) -> None:
+        """Replaces the index's contents; fill_factor only matters to trees."""
+        self.buckets = {}
+        self._size = 0
+        for key, value in sorted_pairs:
+            self.insert(key, value)
+
+    def items(self) -> Iterable[Sequence[int]]:
+        for key in sorted(self.buckets):
+            yield key, list(self.buckets[key])
+
+
+class Bitmap:
+    """Compressed set of RIDs, one bit per RID.
+
+    Bits are kept in chunks of ``Config.records_per_page`` bits keyed by
+    ``rid // Config.records_per_page``, so a chunk covers one logical page and
+    empty chunks take no space. Sets combine chunk by chunk with ``&`` and ``|``.
+    """
+
+    def __init__(self, chunks: Optional[Dict[int, int]] = None) -> None:
+        self.chunks: Dict[int, int] = chunks or {}
+
+    @classmethod
+    def from_rids(cls, rids: Iterable[int]) -> "Bitmap":
+        bitmap = cls()
+        for rid in rids:
+            bitmap.add(rid)
+        return bitmap
+
+    def __len__(self) -> int:
+        return sum(chunk.bit_count() for chunk in self.chunks.values())
+
+    def __contains__(self, rid: int) -> bool:
+        return bool(self.chunks.get(rid // Config.records_per_page, 0) >> (rid % Config.records_per_page) & 1)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        smaller, larger = sorted((self.chunks, other.chunks), key=len)
+        chunks = {}
+        for chunk_id, bits in smaller.items():
+            common = bits & larger.get(chunk_id, 0)
+            if common:
+                chunks[chunk_id] = common
+        return Bitmap(chunks)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        chunks = dict(self.chunks)
+        for chunk_id, bits in other.chunks.items():
+            chunks[chunk_id] = chunks.get(chunk_id, 0) | bits
+        return Bitmap(chunks)
+
+    def add(self, rid: int) -> bool:
+        """Sets the RID's bit; returns False if it was already set."""
+        chunk_id, bit = divmod(rid, Config.records_per_page)
+        chunk = self.chunks.get(chunk_id, 0)
+        if chunk >> bit & 1:
+            return False
+        self.chunks[chunk_id] = chunk | (1 << bit)
+        return True
+
+    def discard(self, rid: int) -> bool:
+        """Clears the RID's bit; returns False if it was not set."""
+        chunk_id, bit = divmod(rid, Config.records_per_page)
+        chunk = self.chunks.get(chunk_id, 0)
+        if not chunk >> bit & 1:
+            return False
+        chunk ^= 1 << bit
+        if chunk:
+            self.chunks[chunk_id] = chunk
+        else:
+            del self.chunks[chunk_id]
+        return True
+
+    def rids(self) -> List[int]:
+        """Lists the RIDs in the set in ascending order."""
+        results: List[int] = []
+        for chunk_id in sorted(self.chunks):
+            chunk = self.chunks[chunk_id]
+            base = chunk_id * Config.records_per_page
+            while chunk:
+                lowest = chunk & -chunk
+                results.append(base + lowest.bit_length() - 1)
+                chunk ^= lowest
+        return results
+
+
+class BitmapIndex:
+    """One Bitmap of RIDs per distinct value, behind the BPlusTree interface.
+
+    Meant for low-cardinality columns: range lookups OR the bitmaps of the values
+    in range, and ``Index.locate_all`` and ``Index.count`` AND the bitmaps of
+    several columns without materializing RIDs in between.
+    """
+
+    def __init__(self) -> None:
+        self.bitmaps: Dict[int, Bitmap] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, key: int, value: int) -> None:
+        if self.bitmaps.setdefault(key, Bitmap()).add(value):
+            self._size += 1
+
+    def find(self, key: int) -> List[int]:
+        bitmap = self.bitmaps.get(key)
+        return bitmap.rids() if bitmap is not None else []
+
+    def find_range(self, start: int, end: int) -> List[int]:
+        return self.bitmap_range(start, end).rids()
+
+    def bitmap_range(self, start: int, end: int) -> Bitmap:
+        result = Bitmap()
+        for key, bitmap in self.bitmaps.items():
+            if start <= key <= end:
+                result = result | bitmap
+        return result
+
+    def remove(self, key: int, value: Optional[int] = None) -> bool:
+        bitmap = self.bitmaps.get(key)
+        if bitmap is None:
+            return False
+        if value is None:
+            self._size -= len(bitmap)
+        elif bitmap.discard(value):
+            self._size -= 1
+            if bitmap.chunks:
+                return True
+        else:
+            return False
+        del self.bitmaps[key]
+        return True
+
+    def bulk_load(self, sorted_pairs: Iterable[Tuple[int, int]], fill_factor: float = 1.0) -> None:
+        """Replaces the index's contents; fill_factor only matters to trees."""
+        self.bitmaps = {}
+        self._size = 0
+        for key, value in sorted_pairs:
+            self.insert(key, value)
+
+    def items(self) -> Iterable[Sequence[int]]:
+        for key in sorted(self.bitmaps):
+            yield key, self.bitmaps[key].rids()
+
+
 class Index:
-    """Maintains secondary structures to accelerate column lookups."""
+    """Maintains secondary structures to accelerate column lookups.
+
+    A column can carry a B+ tree (``indices``), a hash index (``hash_indices``), a
+    bitmap index (``bitmap_indices``) or several of them. Equality lookups prefer
+    the hash index and range lookups the B+ tree, with the bitmap index next in
+    line for both. The primary key gets a tree and a hash index, since point
+    operations and sums over key ranges go through it.
+    """
 
     def __init__(self, table: "Table") -> None:
         self.table = table
-        self.indices: List[Optional[BPlusTree]] = [None] * table.num_columns
+        self.indices: List[Optional[BPlusTree | PartitionedBPlusTree]] = [None] * table.num_columns
+        self.hash_indices: List[Optional[HashIndex]] = [None] * table.num_columns
+        self.bitmap_indices: List[Optional[BitmapIndex]] = [None] * table.num_columns
         # Always build an index for the primary key column.
         self.create_index(table.key)
+        self.create_index(table.key, "hash")
 
     # ------------------------------------------------------------------
     # Lookup helpers
     # ------------------------------------------------------------------
+    def has_index(self, column: int) -> bool:
+        return any(indices[column] is not None for indices in self._all_indices())
+
     def locate(self, column: int, value: int) -> List[int]:
-        tree = self.indices[column]
-        if tree is None:
+        structure = self._pick(column, self.hash_indices, self.bitmap_indices, self.indices)
+        if structure is None:
             return []
-        return tree.find(value)
+        return structure.find(value)
 
     def locate_range(self, begin: int, end: int, column: int) -> List[int]:
-        tree = self.indices[column]
-        if tree is None:
+        structure = self._pick(column, self.indices, self.bitmap_indices, self.hash_indices)
+        if structure is None:
             return []
-        return tree.find_range(begin, end)
+        return structure.find_range(begin, end)
+
+    def locate_bitmap(self, column: int, begin: int, end: int) -> Bitmap:
+        """Gets the RIDs whose value in the column lies in [begin, end] as a Bitmap."""
+        bitmap_index = self.bitmap_indices[column]
+        if bitmap_index is not None:
+            return bitmap_index.bitmap_range(begin, end)
+        return Bitmap.from_rids(self.locate_range(begin, end, column))
+
+    def locate_all(self, conditions: Sequence[Tuple[int, int, int]]) -> List[int]:
+        """
+        Finds the RIDs that satisfy every condition.
+
+        :param conditions: (column, begin, end) tuples, each asking for a value in [begin, end].
+        :return: The matching RIDs in ascending order.
+        """
+        return self._match(conditions).rids()
+
+    def count(self, conditions: Sequence[Tuple[int, int, int]]) -> int:
+        """Counts the RIDs that satisfy every (column, begin, end) condition."""
+        return len(self._match(conditions))
+
+    def _match(self, conditions: Sequence[Tuple[int, int, int]]) -> Bitmap:
+        result: Optional[Bitmap] = None
+        for column, begin, end in conditions:
+            bitmap = self.locate_bitmap(column, begin, end)
+            result = bitmap if result is None else result & bitmap
+            if not result.chunks:
+                break
+        return result if result is not None else Bitmap()
 
     # ------------------------------------------------------------------
     # Mutation helpers
     # ------------------------------------------------------------------
     def add(self, rid: int, columns: List[Optional[int]]) -> None:
-        for column, tree in enumerate(self.indices):
-            if tree is None:
-                continue
+        for column, tree in self._structures():
             value = columns[column]
             if value is None:
                 continue
             tree.insert(value, rid)
 
+    def add_batch(self, rids: List[int], rows: List[List[Optional[int]]]) -> None:
+        # Visit each tree once and insert in key order to keep descents local.
+        for column, tree in self._structures():
+            pairs = sorted(
+                (row[column], rid) for rid, row in zip(rids, rows) if row[column] is not None
+            )
+            for value, rid in pairs:
+                tree.insert(value, rid)
+
     def remove(self, rid: int, columns: List[Optional[int]]) -> None:
-        for column, tree in enumerate(self.indices):
-            if tree is None:
-                continue
+        for column, tree in self._structures():
             value = columns[column]
             if value is None:
                 continue
             tree.remove(value, rid)
 
     def update(self, rid: int, old_values: List[Optional[int]], new_values: List[Optional[int]]) -> None:
-        for column, tree in enumerate(self.indices):
-            if tree is None:
-                continue
+        for column, tree in self._structures():
             old = old_values[column]
             new = new_values[column]
             if old == new or old is None or new is None:
@@ -69,57 +306,72 @@ class Index:
     # ------------------------------------------------------------------
     # Index lifecycle
     # ------------------------------------------------------------------
-    def create_index(self, column_number: int) -> bool:
-        pass
+    def create_index(self, column_number: int, index_type: str = "bplus") -> bool:
+        """
+        Builds an index over the existing rows of a column.
+
+        :param column_number: The data column to index.
+        :param index_type: "bplus" for a B+ tree serving equality and range lookups,
+            "hash" for a hash index serving equality lookups only, or "bitmap" for
+            per-value bitmaps suited to low-cardinality columns.
+        :return: False if the column already has an index of that type.
+        """
         if not 0 <= column_number < self.table.num_columns:
             raise ValueError(f"Column {column_number} out of bounds for index creation")
-        if self.indices[column_number] is not None:
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type!r}")
+        indices = {"bplus": self.indices, "hash": self.hash_indices, "bitmap": self.bitmap_indices}[index_type]
+        if indices[column_number] is not None:
             return False
 
-        tree = BPlusTree()
-        self.indices[column_number] = tree
+        if index_type == "hash":
+            tree = HashIndex()
+        elif index_type == "bitmap":
+            tree = BitmapIndex()
+        elif getattr(self.table, "partition_bounds", None) and column_number == self.table.key:
+            # A key-range partitioned table keeps one key subtree per partition.
+            tree = PartitionedBPlusTree(self.table.partition_bounds)
+        else:
+            tree = BPlusTree()
+        indices[column_number] = tree
         self._bulk_load(column_number, tree)
         return True
 
     def drop_index(self, column_number: int) -> bool:
-        pass
         if column_number == self.table.key:
             # Primary key index must always exist.
             return False
-        if self.indices[column_number] is None:
+        if not self.has_index(column_number):
             return False
-        self.indices[column_number] = None
+        for indices in self._all_indices():
+            indices[column_number] = None
         return True
 
     # ------------------------------------------------------------------
     # Bulk loading helpers
     # ------------------------------------------------------------------
-    def _bulk_load(self, column_number: int, tree: BPlusTree) -> None:
-        pass
-        for rid, row in self._iterate_existing_rows():
-            try:
-                value = row[column_number]
-            except IndexError:
-                continue
-            if value is None:
-                continue
-            tree.insert(value, rid)
+    def _all_indices(self) -> Tuple[List, List, List]:
+        return self.indices, self.hash_indices, self.bitmap_indices
 
-    def _iterate_existing_rows(self) -> Iterable[Tuple[int, List[Optional[int]]]]:
-        pass
-        if hasattr(self.table, "iter_rows_for_index"):
-            yield from self.table.iter_rows_for_index()
-            return
+    @staticmethod
+    def _pick(column: int, *preference: List) -> Optional[BPlusTree | PartitionedBPlusTree | HashIndex | BitmapIndex]:
+        for indices in preference:
+            if indices[column] is not None:
+                return indices[column]
+        return None
 
-        directory = getattr(self.table, "page_directory", None)
-        get_record = getattr(self.table, "get_record", None)
-        if directory is None or get_record is None:
-            return
+    def _structures(self) -> Iterator[Tuple[int, BPlusTree | PartitionedBPlusTree | HashIndex | BitmapIndex]]:
+        for indices in self._all_indices():
+            for column, tree in enumerate(indices):
+                if tree is not None:
+                    yield column, tree
 
-        # If the table exposes a page directory, iterate known RIDs.
-        for rid in range(directory.num_base_records):
-            try:
-                record = get_record(rid)
-            except RuntimeError:
-                continue
-            yield rid, record[Config.base_meta_columns :]
+    def _bulk_load(self, column_number: int, tree: BPlusTree | PartitionedBPlusTree | HashIndex | BitmapIndex) -> None:
+        iter_rows = getattr(self.table, "iter_rows_for_index", None)
+        if iter_rows is None:
+            return
+        # Only the indexed column is read, at its latest version and without deleted rows.
+        pairs = [(value, rid) for rid, value in iter_rows(column_number) if value is not None]
+        # Sorted pairs let a tree pack its leaves instead of splitting its way up.
+        pairs.sort()
+        tree.bulk_load(pairs, Config.index_fill_factor)
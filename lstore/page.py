@@ -1,10 +1,78 @@
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import accumulate, repeat
+
 from config import Config
 
 
+# Per-page summary of the non-null values in a page; min/max are None when empty.
+ZoneMap = namedtuple("ZoneMap", ["min", "max", "count", "sum"])
+
+# Unsigned array typecodes tried in order when bit-packing frame-of-reference offsets.
+_PACKED_TYPECODES = ("B", "H", "I", "Q")
+
+# Delta-encoded pages store an absolute checkpoint every this many slots.
+_DELTA_BLOCK = 64
+
+# Slot view shared by pages whose buffer has not been allocated yet.
+_EMPTY_SLOTS = memoryview(bytearray()).cast("q")
+
+
+class PageBufferPool:
+    """
+    Free list of page-sized buffers shared by every Page.
+
+    Pages take a buffer on their first write and hand it back through ``Page.release``,
+    so dropped tables and replaced pages feed later allocations instead of the allocator.
+    At most ``Config.free_page_buffers`` buffers are kept; the rest are left to GC.
+    Recycled buffers are not zeroed, since a Page never reads past ``num_records``.
+    """
+
+    def __init__(self, max_free=Config.free_page_buffers):
+        self.max_free = max_free
+        self._free = []
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self):
+        """
+        Takes a buffer from the free list, allocating a new one if it is empty.
+
+        :return: A typed memoryview of Config.records_per_page signed 64-bit slots.
+        """
+        if self._free:
+            return self._free.pop()
+        return memoryview(bytearray(Config.page_size)).cast("q")
+
+    def release(self, slots):
+        """
+        Returns a buffer to the free list.
+
+        :param slots: The typed memoryview previously handed out by acquire.
+        """
+        if len(self._free) < self.max_free:
+            self._free.append(slots)
+
+
+buffer_pool = PageBufferPool()
+
+
 class Page:
     """
     The Page class represents a fixed-size columnar page, storing 64-bit integer values.
     Supports basic record management including write, read, and range-read operations.
+
+    Slots are exposed through ``slots``, a typed ``memoryview`` over ``data`` cast to
+    signed 64-bit integers (native byte order), so reads and writes never allocate
+    intermediate byte slices.
+
+    Each page also keeps a zone map (min, max, non-null count and sum) that is
+    maintained as values are written, ignoring ``Config.null_value`` slots.
+
+    The buffer is taken from ``buffer_pool`` on the first write rather than at
+    construction, and ``release`` hands it back once the page is no longer needed.
     """
 
     def __init__(self):
@@ -12,9 +80,16 @@ class Page:
         Initializes an empty page with capacity for MAX_SLOTS 64-bit integers.
         """
         self.num_records = 0
-        self.data = bytearray(Config.page_size)
+        self.data = None
+        self.slots = _EMPTY_SLOTS
         self.page_id = id(self)
         self.capacity = Config.records_per_page
+        self.non_null_count = 0
+        self.value_sum = 0
+        self._min_value = None
+        self._max_value = None
+        # Set when an overwrite removes the current min or max; bounds are rebuilt on demand.
+        self._bounds_stale = False
 
     def has_capacity(self):
         """
@@ -43,14 +118,41 @@ class Page:
         """
         if not self.has_capacity():
             return False
-        slot_offset = self.get_offset(self.num_records)
-        self.data[slot_offset:slot_offset + Config.int_size] = value.to_bytes(
-            Config.int_size,
-            byteorder=Config.byteorder,
-            signed=True,
-        )
-        self.num_records += 1
-        return self.num_records - 1
+        if self.data is None:
+            self._allocate()
+        slot_index = self.num_records
+        self.slots[slot_index] = value
+        self.num_records = slot_index + 1
+        self._track(value)
+        return slot_index
+
+    def write_many(self, values):
+        """
+        Appends as many 64-bit signed integers from values as fit in the page.
+
+        :param values: Sequence of integer values to append, in order.
+        :return: The number of values written (0 if the page is already full).
+        """
+        start = self.num_records
+        count = min(len(values), Config.records_per_page - start)
+        if count <= 0:
+            return 0
+        if self.data is None:
+            self._allocate()
+        written = values[:count]
+        self.slots[start:start + count] = array("q", written)
+        self.num_records = start + count
+        present = [value for value in written if value != Config.null_value]
+        if present:
+            self.non_null_count += len(present)
+            self.value_sum += sum(present)
+            if not self._bounds_stale:
+                low, high = min(present), max(present)
+                if self._min_value is None or low < self._min_value:
+                    self._min_value = low
+                if self._max_value is None or high > self._max_value:
+                    self._max_value = high
+        return count
 
     def write_slot(self, slot_index, value):
         """
@@ -72,21 +174,16 @@ class Page:
         if slot_index == self.num_records:
             if not self.has_capacity():
                 return False
-            slot_offset = self.get_offset(slot_index)
-            self.data[slot_offset:slot_offset + Config.int_size] = value.to_bytes(
-                Config.int_size,
-                byteorder=Config.byteorder,
-                signed=True,
-            )
+            if self.data is None:
+                self._allocate()
+            self.slots[slot_index] = value
             self.num_records += 1
+            self._track(value)
             return slot_index
 
-        slot_offset = self.get_offset(slot_index)
-        self.data[slot_offset:slot_offset + Config.int_size] = value.to_bytes(
-            Config.int_size,
-            byteorder=Config.byteorder,
-            signed=True,
-        )
+        self._untrack(self.slots[slot_index])
+        self.slots[slot_index] = value
+        self._track(value)
         return slot_index
 
     def read(self, slot_index):
@@ -98,12 +195,7 @@ class Page:
         """
         if slot_index < 0 or slot_index >= self.num_records:
             raise IndexError(f"Index {slot_index} out of bounds [0, {self.num_records})")
-        slot_offset = self.get_offset(slot_index)
-        return int.from_bytes(
-            self.data[slot_offset:slot_offset + Config.int_size],
-            byteorder=Config.byteorder,
-            signed=True,
-        )
+        return self.slots[slot_index]
 
     def read_range(self, start=0, end=None):
         """
@@ -111,13 +203,95 @@ class Page:
 
         :param start: The starting index (inclusive).
         :param end: The ending index (exclusive). Defaults to num_records if None
-        :return: A list of integer values from start to end-1 slots.
+        :return: A zero-copy memoryview of the integer values from start to end-1 slots.
+            The view reflects later in-place writes; call ``tolist()`` for a snapshot.
         """
         if end is None:
             end = self.num_records
         if start < 0 or start > self.num_records or end < 0 or end > self.num_records or start > end:
             raise IndexError(f"Invalid range [{start}, {end}) out of bounds [0, {self.num_records}) or start > end")
-        return [self.read(slot_index) for slot_index in range(start, end)]
+        return self.slots[start:end]
+
+    @property
+    def nbytes(self):
+        """Bytes of slot storage held by the page."""
+        return 0 if self.data is None else len(self.data)
+
+    def _allocate(self):
+        self.slots = buffer_pool.acquire()
+        self.data = self.slots.obj
+
+    def release(self):
+        """
+        Empties the page and returns its buffer to the pool.
+        Views previously returned by read_range must not be used afterwards.
+        """
+        if self.data is not None:
+            buffer_pool.release(self.slots)
+        self.num_records = 0
+        self.data = None
+        self.slots = _EMPTY_SLOTS
+        self.non_null_count = 0
+        self.value_sum = 0
+        self._min_value = None
+        self._max_value = None
+        self._bounds_stale = False
+
+    def decode(self):
+        """
+        Decodes every written slot at once, for whole-page scans.
+
+        :return: A list of the integer values in slot order.
+        """
+        return self.slots[:self.num_records].tolist()
+
+    @property
+    def min_value(self):
+        """Smallest non-null value written to the page, or None if there is none."""
+        if self._bounds_stale:
+            self._rebuild_bounds()
+        return self._min_value
+
+    @property
+    def max_value(self):
+        """Largest non-null value written to the page, or None if there is none."""
+        if self._bounds_stale:
+            self._rebuild_bounds()
+        return self._max_value
+
+    def zone_map(self):
+        """
+        Summarizes the non-null values currently stored in the page.
+
+        :return: A ZoneMap of (min, max, count, sum).
+        """
+        return ZoneMap(self.min_value, self.max_value, self.non_null_count, self.value_sum)
+
+    def _track(self, value):
+        if value == Config.null_value:
+            return
+        self.non_null_count += 1
+        self.value_sum += value
+        if self._bounds_stale:
+            return
+        if self._min_value is None or value < self._min_value:
+            self._min_value = value
+        if self._max_value is None or value > self._max_value:
+            self._max_value = value
+
+    def _untrack(self, value):
+        if value == Config.null_value:
+            return
+        self.non_null_count -= 1
+        self.value_sum -= value
+        if value == self._min_value or value == self._max_value:
+            self._bounds_stale = True
+
+    def _rebuild_bounds(self):
+        present = [value for value in self.slots[:self.num_records] if value != Config.null_value]
+        self._min_value = min(present) if present else None
+        self._max_value = max(present) if present else None
+        self._bounds_stale = False
 
     def __repr__(self):
         """Provide a concise, human-readable view when pages are printed."""
@@ -127,3 +301,349 @@ class Page:
         )
 
     __str__ = __repr__
+
+
+class BasePage(list):
+    """
+    Logical base page: one physical page per column (meta + data), in column order.
+
+    ``tps`` (tail-page sequence number) counts the range's tail records already folded
+    into these pages by a merge, so tails below it never need to be read for the latest
+    version. ``original`` keeps the pre-merge logical page so older versions can still be
+    rebuilt; it is None until the page is first merged.
+    """
+
+    def __init__(self, pages=(), tps=0, original=None):
+        super().__init__(pages)
+        self.tps = tps
+        self.original = original
+
+
+class TailPage:
+    """
+    Logical tail page that stores only the data columns a tail record updates.
+
+    The tail meta columns are kept densely, one Page per column, so ``tail_page[column]``
+    behaves like the list of Pages used for base pages. Updated data values are appended
+    to a shared value log (a list of Pages), and a start offset per record locates them.
+    Which columns the values belong to is given by the record's schema encoding.
+    """
+
+    def __init__(self, num_meta_columns):
+        """
+        Initializes an empty tail page.
+
+        :param num_meta_columns: Number of dense meta columns per tail record.
+        """
+        self.meta = [Page() for _ in range(num_meta_columns)]
+        self.value_offsets = Page()
+        self.value_pages = [Page()]
+        self.num_values = 0
+
+    @property
+    def num_records(self):
+        return self.value_offsets.num_records
+
+    def has_capacity(self):
+        """
+        Checks if there is room for another tail record in the page.
+
+        :return: True if at least one more record fits, False otherwise.
+        """
+        return self.value_offsets.has_capacity()
+
+    def __getitem__(self, column):
+        """Returns the Page holding the given meta column."""
+        return self.meta[column]
+
+    def __len__(self):
+        return len(self.meta)
+
+    def __iter__(self):
+        return iter(self.meta)
+
+    def append(self, meta_values, data_values):
+        """
+        Appends a tail record.
+
+        :param meta_values: The record's meta column values, in column order.
+        :param data_values: Only the updated data values, in column order.
+        :return: The slot the record was written to, or False if the page is full.
+        """
+        if not self.has_capacity():
+            return False
+        for page, value in zip(self.meta, meta_values):
+            page.write(value)
+        self.value_offsets.write(self.num_values)
+
+        remaining = data_values
+        while remaining:
+            written = self.value_pages[-1].write_many(remaining)
+            remaining = remaining[written:]
+            if remaining:
+                self.value_pages.append(Page())
+        self.num_values += len(data_values)
+        return self.num_records - 1
+
+    def read_meta(self, slot_index):
+        """
+        Reads the meta columns of a tail record.
+
+        :param slot_index: Slot index to read from.
+        :return: A list of the meta column values.
+        """
+        return [page.read(slot_index) for page in self.meta]
+
+    def read_values(self, slot_index):
+        """
+        Reads the updated data values of a tail record.
+
+        :param slot_index: Slot index to read from.
+        :return: A list of the stored data values, in column order.
+        """
+        start = self.value_offsets.read(slot_index)
+        if slot_index + 1 < self.num_records:
+            end = self.value_offsets.read(slot_index + 1)
+        else:
+            end = self.num_values
+        values = []
+        while start < end:
+            page_index, slot = divmod(start, Config.records_per_page)
+            count = min(end - start, Config.records_per_page - slot)
+            values.extend(self.value_pages[page_index].read_range(slot, slot + count))
+            start += count
+        return values
+
+    def read_value(self, slot_index, position):
+        """
+        Reads a single updated data value of a tail record.
+
+        :param slot_index: Slot index to read from.
+        :param position: Position of the value among the record's stored values, which is the
+            number of updated columns that precede it.
+        :return: The stored data value.
+        """
+        page_index, slot = divmod(self.value_offsets.read(slot_index) + position, Config.records_per_page)
+        return self.value_pages[page_index].read(slot)
+
+    @property
+    def nbytes(self):
+        """Bytes of slot storage held by the page."""
+        pages = [*self.meta, self.value_offsets, *self.value_pages]
+        return sum(page.nbytes for page in pages)
+
+    def release(self):
+        """Empties the tail page and returns every buffer it holds to the pool."""
+        for page in [*self.meta, self.value_offsets, *self.value_pages]:
+            page.release()
+        self.value_pages = [self.value_pages[0]]
+        self.num_values = 0
+
+    def __repr__(self):
+        """Provide a concise, human-readable view when pages are printed."""
+        return f"TailPage(records={self.num_records}, values={self.num_values})"
+
+    __str__ = __repr__
+
+
+def _pack_offsets(offsets, span):
+    """Packs non-negative offsets into the narrowest unsigned array able to hold span."""
+    for typecode in _PACKED_TYPECODES:
+        if span < 1 << (array(typecode).itemsize * 8):
+            return array(typecode, offsets)
+    raise ValueError(f"Offset span {span} does not fit in 64 bits")
+
+
+class EncodedPage:
+    """
+    Read-only, compressed replacement for a full base Page.
+
+    The values are encoded once with whichever of these schemes is smallest:
+
+    - ``"for"``: frame of reference; offsets from the minimum are packed into the
+      narrowest byte-aligned unsigned array (a constant page packs to nothing).
+    - ``"rle"``: run-length; run values plus cumulative run ends, read by bisection.
+    - ``"delta"``: first value plus frame-of-reference packed deltas, with an absolute
+      checkpoint every ``_DELTA_BLOCK`` slots. Suits monotonic key and RID columns.
+
+    Reads decode only the requested slot, and ``decode`` rebuilds the whole page in
+    one pass for scans. The zone map is computed once at encode time.
+    """
+
+    def __init__(self, values):
+        """
+        Encodes the given values with the most compact scheme.
+
+        :param values: Sequence of 64-bit signed integers, in slot order.
+        """
+        values = list(values)
+        self.num_records = len(values)
+        self.capacity = self.num_records
+        self.page_id = id(self)
+
+        present = [value for value in values if value != Config.null_value]
+        self.non_null_count = len(present)
+        self.value_sum = sum(present)
+        self.min_value = min(present) if present else None
+        self.max_value = max(present) if present else None
+
+        candidates = [self._encode_for(values), self._encode_rle(values)]
+        if len(values) > 1:
+            delta = self._encode_delta(values)
+            if delta is not None:
+                candidates.append(delta)
+        self.encoding, self._parts = min(candidates, key=lambda candidate: self._parts_nbytes(candidate[1]))
+
+    @classmethod
+    def from_page(cls, page):
+        """
+        Encodes the current contents of a page.
+
+        :param page: The Page to encode.
+        :return: A new EncodedPage holding the same values.
+        """
+        return cls(page.decode())
+
+    @staticmethod
+    def _parts_nbytes(parts):
+        return sum(part.itemsize * len(part) for part in parts.values() if isinstance(part, array))
+
+    @property
+    def nbytes(self):
+        """Bytes of encoded storage held by the page."""
+        return self._parts_nbytes(self._parts)
+
+    def _encode_for(self, values):
+        base = min(values) if values else 0
+        span = (max(values) - base) if values else 0
+        if span == 0:
+            return "for", {"base": base, "offsets": None}
+        return "for", {"base": base, "offsets": _pack_offsets([value - base for value in values], span)}
+
+    def _encode_rle(self, values):
+        run_values = array("q")
+        run_ends = array("q")
+        for position, value in enumerate(values):
+            if run_values and run_values[-1] == value:
+                run_ends[-1] = position + 1
+            else:
+                run_values.append(value)
+                run_ends.append(position + 1)
+        return "rle", {"values": run_values, "ends": run_ends}
+
+    def _encode_delta(self, values):
+        deltas = [current - previous for previous, current in zip(values, values[1:])]
+        base = min(deltas)
+        span = max(deltas) - base
+        if span >= 1 << 64:
+            return None
+        checkpoints = array("q", values[::_DELTA_BLOCK])
+        offsets = None if span == 0 else _pack_offsets([delta - base for delta in deltas], span)
+        return "delta", {"base": base, "offsets": offsets, "checkpoints": checkpoints}
+
+    def has_capacity(self):
+        """Encoded pages are immutable, so they never have room for another record."""
+        return False
+
+    def write(self, value):
+        """Encoded pages are immutable; appends always report a full page."""
+        return False
+
+    def write_many(self, values):
+        """Encoded pages are immutable; no values are ever appended."""
+        return 0
+
+    def release(self):
+        """Encoded pages own no pooled buffer, so there is nothing to return."""
+
+    def write_slot(self, slot_index, value):
+        """Encoded pages are immutable; in-place writes are rejected."""
+        raise RuntimeError("Encoded pages are read-only; rewrite the page to change its values")
+
+    def read(self, slot_index):
+        """
+        Decodes a single slot.
+
+        :param slot_index: Slot index to read from.
+        :return: The integer value at the specified slot.
+        """
+        if slot_index < 0 or slot_index >= self.num_records:
+            raise IndexError(f"Index {slot_index} out of bounds [0, {self.num_records})")
+        parts = self._parts
+        if self.encoding == "for":
+            offsets = parts["offsets"]
+            return parts["base"] if offsets is None else parts["base"] + offsets[slot_index]
+        if self.encoding == "rle":
+            return parts["values"][bisect_right(parts["ends"], slot_index)]
+
+        block, position = divmod(slot_index, _DELTA_BLOCK)
+        value = parts["checkpoints"][block]
+        if position:
+            offsets = parts["offsets"]
+            start = block * _DELTA_BLOCK
+            value += parts["base"] * position
+            if offsets is not None:
+                value += sum(offsets[start:start + position])
+        return value
+
+    def read_range(self, start=0, end=None):
+        """
+        Decodes a sequence of values from a range of slots.
+
+        :param start: The starting index (inclusive).
+        :param end: The ending index (exclusive). Defaults to num_records if None
+        :return: A list of integer values from start to end-1 slots.
+        """
+        if end is None:
+            end = self.num_records
+        if start < 0 or start > self.num_records or end < 0 or end > self.num_records or start > end:
+            raise IndexError(f"Invalid range [{start}, {end}) out of bounds [0, {self.num_records}) or start > end")
+        if start == 0 and end == self.num_records:
+            return self.decode()
+        return [self.read(slot_index) for slot_index in range(start, end)]
+
+    def decode(self):
+        """
+        Decodes every slot at once, for whole-page scans.
+
+        :return: A list of the integer values in slot order.
+        """
+        parts = self._parts
+        if self.encoding == "for":
+            offsets = parts["offsets"]
+            if offsets is None:
+                return [parts["base"]] * self.num_records
+            return list(map(parts["base"].__add__, offsets))
+        if self.encoding == "rle":
+            values = []
+            previous_end = 0
+            for value, run_end in zip(parts["values"], parts["ends"]):
+                values.extend(repeat(value, run_end - previous_end))
+                previous_end = run_end
+            return values
+
+        if self.num_records == 0:
+            return []
+        offsets = parts["offsets"]
+        if offsets is None:
+            deltas = repeat(parts["base"], self.num_records - 1)
+        else:
+            deltas = map(parts["base"].__add__, offsets)
+        return list(accumulate(deltas, initial=parts["checkpoints"][0]))
+
+    def zone_map(self):
+        """
+        Summarizes the non-null values stored in the page.
+
+        :return: A ZoneMap of (min, max, count, sum).
+        """
+        return ZoneMap(self.min_value, self.max_value, self.non_null_count, self.value_sum)
+
+    def __repr__(self):
+        """Provide a concise, human-readable view when pages are printed."""
+        return (
+            f"EncodedPage(id={self.page_id}, records={self.num_records}, "
+            f"encoding={self.encoding}, bytes={self.nbytes})"
+        )
+
+    __str__ = __repr__
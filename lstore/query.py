@@ -55,7 +55,7 @@ class Query:
             
             # check if primary key already exists (only if index exists)
             primary_key = columns[self.table.key]
-            if self.table.index.indices[self.table.key] is not None:
+            if self.table.index.has_index(self.table.key):
                 existing_rids = self.table.index.locate(self.table.key, primary_key)
                 if existing_rids:
                     return False
@@ -82,9 +82,14 @@ class Query:
     """
     def select(self, search_key, search_key_index, projected_columns_index):
         try:
+            # a dictionary-encoded column knows when no live record holds the value
+            dictionary = self.table.dictionaries[search_key_index]
+            if dictionary is not None and not dictionary.count(search_key):
+                return []
+
             # create index for search column if it doesn't exist (for non-primary key searches)
-            if self.table.index.indices[search_key_index] is None:
-                self.table.index.create_index(search_key_index)
+            if not self.table.index.has_index(search_key_index):
+                self.table.index.create_index(search_key_index, "hash")
             
             # use index to find matching RIDs
             rids = self.table.index.locate(search_key_index, search_key)
@@ -92,10 +97,12 @@ class Query:
             if not rids:
                 return []
             
-            results = []
-            for rid in rids:
-                full_record = self.table.get_cumulative_updated_record(rid)
+            # the key is always read so each Record can carry it
+            fetched_columns = list(projected_columns_index)
+            fetched_columns[self.table.key] = 1
 
+            results = []
+            for rid, full_record in zip(rids, self.table.get_records(rids, fetched_columns)):
                 if full_record[Config.indirection_column] == Config.deleted_record_value:
                     continue
 
@@ -128,8 +135,8 @@ class Query:
     def select_version(self, search_key, search_key_index, projected_columns_index, relative_version):
         try:
             # create index for the search column if it doesn't exist (for non-primary key searches)
-            if self.table.index.indices[search_key_index] is None:
-                self.table.index.create_index(search_key_index)
+            if not self.table.index.has_index(search_key_index):
+                self.table.index.create_index(search_key_index, "hash")
             
             # use index to find matching rids
             rids = self.table.index.locate(search_key_index, search_key)
@@ -187,27 +194,18 @@ class Query:
             
             base_rid = rids[0]
             
-            # get current record values to update index
-            current_record = self.table.get_cumulative_updated_record(base_rid)
+            # only the tombstone is needed here, the table reads old values for index upkeep
+            current_record = self.table.get_projected_record(base_rid, [0] * self.table.num_columns)
             if current_record[Config.indirection_column] == Config.deleted_record_value:
                 return False
-            current_data = current_record[Config.tail_meta_columns:]
             
             # create tail record with metadata
             tail_meta = [Config.null_value for _ in range(Config.tail_meta_columns)]
             tail_data = []
             
-            # build new values and track what changed
-            new_data = []
-            for i, new_value in enumerate(columns):
-                if new_value is None:
-                    # no update for this column
-                    tail_data.append(Config.null_value)
-                    new_data.append(current_data[i])
-                else:
-                    # update this column
-                    tail_data.append(new_value)
-                    new_data.append(new_value)
+            # columns left as None are not updated
+            for new_value in columns:
+                tail_data.append(Config.null_value if new_value is None else new_value)
             
             tail_record = tail_meta + tail_data
             
@@ -229,18 +227,31 @@ class Query:
     """
     def sum(self, start_range, end_range, aggregate_column_index):
         try:
-            # use index range query to find all rids in the key range
+            # untouched base pages fully inside the key range are answered from their zone maps
+            total, found_any, answered_pages, complete = self.table.sum_from_zone_maps(
+                start_range, end_range, aggregate_column_index
+            )
+            if complete:
+                return total if found_any else False
+
+            # use index range query to find the remaining rids in the key range
             rids = self.table.index.locate_range(start_range, end_range, self.table.key)
             
-            if not rids:
+            if not rids and not found_any:
                 return False
             
-            total = 0
-            found_any = False
-            
+            aggregate_columns = [0] * self.table.num_columns
+            aggregate_columns[aggregate_column_index] = 1
+
+            directory = self.table.page_directory
+            remaining_rids = []
             for rid in rids:
-                full_record = self.table.get_cumulative_updated_record(rid)
+                range_id, _, page_index, _ = directory.decode_rid(rid)
+                if (range_id, page_index) not in answered_pages:
+                    remaining_rids.append(rid)
 
+            # fetch the remaining rids page by page instead of one random read each
+            for full_record in self.table.get_records(remaining_rids, aggregate_columns):
                 if full_record[Config.indirection_column] == Config.deleted_record_value:
                     continue
 
@@ -256,6 +267,110 @@ class Query:
             return False
 
     
+    """
+    # Read matching records as they were at a commit timestamp
+    # :param search_key: the value you want to search based on
+    # :param search_key_index: the column index you want to search based on
+    # :param projected_columns_index: what columns to return. array of 1 or 0 values.
+    # :param timestamp: commit timestamp to read as of, e.g. from lstore.clock.commit_clock.now()
+    # Returns a list of Record objects upon success, including records deleted since
+    # Returns False if the query fails or merges have reclaimed records deleted after that time
+    """
+    def select_as_of(self, search_key, search_key_index, projected_columns_index, timestamp):
+        try:
+            # merges have reclaimed records that may have existed at that time
+            if timestamp < self.table.page_directory.history_horizon:
+                return False
+
+            if search_key_index == self.table.key:
+                rids = self._key_rids_as_of(search_key, search_key)
+            else:
+                # the index holds current values only, so older values need a scan
+                rids = self.table.page_directory.iter_base_rids()
+
+            results = []
+            for rid in rids:
+                full_record = self.table.get_record_as_of(rid, timestamp)
+                if full_record is None:
+                    continue
+
+                data_columns = full_record[Config.tail_meta_columns:]
+                if data_columns[search_key_index] != search_key:
+                    continue
+
+                projected_data = []
+                for i, include in enumerate(projected_columns_index):
+                    projected_data.append(data_columns[i] if include else None)
+
+                record = Record(data_columns[self.table.key], projected_data)
+                record.rid = rid
+                results.append(record)
+
+            return results
+        except Exception:
+            return False
+
+    
+    """
+    :param start_range: int         # Start of the key range to aggregate 
+    :param end_range: int           # End of the key range to aggregate 
+    :param aggregate_columns: int  # Index of desired column to aggregate
+    :param timestamp: int          # Commit timestamp to read as of
+    # Returns the summation over the records that existed at that time
+    # Returns False if no record existed in the given range
+    # Returns False if merges have reclaimed records deleted after that time
+    """
+    def sum_as_of(self, start_range, end_range, aggregate_column_index, timestamp):
+        try:
+            # merges have reclaimed records that may have existed at that time
+            if timestamp < self.table.page_directory.history_horizon:
+                return False
+
+            rids = self._key_rids_as_of(start_range, end_range)
+
+            total = 0
+            found_any = False
+            for rid in rids:
+                full_record = self.table.get_record_as_of(rid, timestamp)
+                if full_record is None:
+                    continue
+
+                data_columns = full_record[Config.tail_meta_columns:]
+                if not start_range <= data_columns[self.table.key] <= end_range:
+                    continue
+
+                value = data_columns[aggregate_column_index]
+                if value != Config.null_value:
+                    total += value
+                    found_any = True
+
+            return total if found_any else False
+        except Exception:
+            return False
+
+    """
+    # Finds the base records that may have held a key in [start_range, end_range] in the past
+    # Returns the candidate RIDs, which callers check against the version they read
+    """
+    def _key_rids_as_of(self, start_range, end_range):
+        directory = self.table.page_directory
+        if directory.key_updated:
+            # keys may have held other values before, so only a scan finds every record
+            return directory.iter_base_rids()
+
+        if start_range == end_range:
+            rids = self.table.index.locate(self.table.key, start_range)
+        else:
+            rids = self.table.index.locate_range(start_range, end_range, self.table.key)
+        # deleted records have left the index but may have existed at that time
+        key_projection = [0] * self.table.num_columns
+        key_projection[self.table.key] = 1
+        for rid in directory.delete_timestamps:
+            key = self.table.get_projected_record(rid, key_projection)[Config.tail_meta_columns + self.table.key]
+            if start_range <= key <= end_range:
+                rids.append(rid)
+        return rids
+
     """
     :param start_range: int         # Start of the key range to aggregate 
     :param end_range: int           # End of the key range to aggregate 
@@ -1,9 +1,15 @@
-from collections import defaultdict
-from time import time
+from bisect import bisect_right
+from collections import Counter
+from itertools import groupby
+from operator import eq, ge, gt, le, lt, ne
+from threading import RLock, Thread
 
 from config import Config
+from lstore.cache import RowCache
+from lstore.clock import commit_clock
+from lstore.dictionary import ColumnDictionary
 from lstore.index import Index
-from lstore.page import Page
+from lstore.page import BasePage, EncodedPage, Page, TailPage
 
 
 class Record:
@@ -26,31 +32,176 @@ class Record:
     def __repr__(self):
         return f"Record(rid={self.rid}, key={self.key}, columns={self.columns})"
 
+# Comparison operators accepted in scan predicates.
+_PREDICATE_OPERATORS = {"==": eq, "!=": ne, "<": lt, "<=": le, ">": gt, ">=": ge}
+
+
+def _zone_map_excludes(zone_map, operator: str, value: int):
+    """Returns True when no value within the zone map's bounds can satisfy the comparison."""
+    if zone_map.count == 0:
+        return True
+    if operator == "==":
+        return value < zone_map.min or value > zone_map.max
+    if operator == "!=":
+        return zone_map.min == zone_map.max == value
+    if operator == "<":
+        return zone_map.min >= value
+    if operator == "<=":
+        return zone_map.min > value
+    if operator == ">":
+        return zone_map.max <= value
+    return zone_map.max < value
+
+
+def _log2(value: int):
+    """Returns log2(value) when value is a power of two, otherwise None."""
+    return value.bit_length() - 1 if value > 0 and value & (value - 1) == 0 else None
+
+
+# RID layout is range | segment | page | slot, where segment 0 holds the base records
+# and segments 1.. are tail segments appended as updates fill them. When every size
+# is a power of two each field is a bit slice, so decoding needs only shifts and masks.
+_SLOT_BITS = _log2(Config.records_per_page)
+_OFFSET_BITS = _log2(Config.records_per_range)
+_RANGE_SHIFT = _log2(Config.range_cap)
+_SHIFT_DECODE = None not in (_SLOT_BITS, _OFFSET_BITS, _RANGE_SHIFT)
+if _SHIFT_DECODE:
+    _SLOT_MASK = Config.records_per_page - 1
+    _PAGE_MASK = Config.pages_per_range - 1
+    _SEGMENT_MASK = (Config.range_cap // Config.records_per_range) - 1
+
+
 class PageDirectory:
-    def __init__(self, num_columns: int, num_ranges: int = Config.initial_page_ranges):
-        # Each range lazily maps to base and tail logical pages (column-major Page instances).
-        self.page_directory = defaultdict(lambda: {"base": [], "tail": []})
+    def __init__(
+        self,
+        num_columns: int,
+        num_ranges: int = Config.initial_page_ranges,
+        cumulative: bool = False,
+        partition_bounds: list[int] = (),
+        key_column: int = 0,
+    ):
+        # Key-range partitions: partition p holds the keys in [bounds[p - 1], bounds[p]) and
+        # owns the page ranges listed in partition_ranges[p], so its records, merges and
+        # reclaimed slots never share a range with another partition. Without bounds the
+        # whole table is one partition and ranges fill in insertion order.
+        self.partition_bounds = sorted(partition_bounds)
+        self.key_column = key_column
+        self.partition_ranges = [[] for _ in range(len(self.partition_bounds) + 1)]
+        self.range_partitions = []
+        # With cumulative tails every tail record carries all columns updated since its base
+        # page was last merged, so the latest version is the base record plus the newest
+        # tail. A tail written right after a merge starts afresh; tail_restarts lists the
+        # positions of those tails in each record's version_tails.
+        self.cumulative = cumulative
+        self.tail_restarts = {}
+        # Flat directory: page_directory[range_id][segment] is the list of logical pages of
+        # that segment, indexed by page_index. Config.base_segment holds the base pages and
+        # every segment from Config.tail_segment on holds tail pages; a range opens another
+        # tail segment whenever the last one fills, so updates never run out of RIDs.
+        # Base logical pages are column-major Page lists; tail logical pages are TailPages.
+        self.page_directory = []
         self.num_columns = num_columns
         self.num_ranges = num_ranges
         self.num_base_records = 0
         self.num_tail_records = 0
-        self.base_offsets = defaultdict(int)
-        self.tail_offsets = defaultdict(int)
+        self.base_offsets = []
+        self.tail_offsets = []
+        # Tail records of each range that existed when it was last merged.
+        self.merged_tails = []
+        # Writers hold the lock; reads and the build phase of a merge do not.
+        self.lock = RLock()
+        # Pages swapped out of each range, returned to the buffer pool at the range's next
+        # merge so readers that picked them up before the swap can finish.
+        self._retired_pages = []
+        # Version index: the tail RIDs of each updated base record, oldest first, so the
+        # version count is their length. Every Config.version_checkpoint_interval tails a
+        # snapshot of the record's data columns is kept, so any version is rebuilt from
+        # the nearest snapshot plus fewer than that many tail reads.
+        self.version_tails = {}
+        self.version_checkpoints = {}
+        # Commit timestamps of deletes, so time-travel reads still see deleted records.
+        self.delete_timestamps = {}
+        # Latest delete timestamp among reclaimed records. Reads as of an earlier time
+        # would miss those records, so they are refused rather than answered partially.
+        self.history_horizon = 0
+        # Whether any tail has written the key column. Until one does, every record's key
+        # is the one it was inserted with, so the key index also answers past lookups.
+        self.key_updated = False
+        # Space reclamation: deleted base RIDs of each range awaiting a merge, and the
+        # slots a merge has reclaimed for new inserts to reuse. A reclaimed record leaves
+        # the version index and time-travel reads, and tail pages whose every record
+        # belongs to reclaimed records are released (dead_tails counts them per page).
+        self.deleted_rids = []
+        self.free_slots = []
+        self.dead_tails = {}
+        # Base pages of each range that a running merge is rebuilding. Their free slots
+        # are not handed out, since a write to the old page would be lost at the swap.
+        self.merging_pages = []
+
+    def _ensure_range(self, range_id: int):
+        while range_id >= len(self.page_directory):
+            self.page_directory.append([[], []])
+            self.base_offsets.append(0)
+            self.tail_offsets.append(0)
+            self.merged_tails.append(0)
+            self._retired_pages.append([])
+            self.deleted_rids.append([])
+            self.free_slots.append([])
+            self.merging_pages.append(set())
 
+    if _SHIFT_DECODE:
+        def encode_rid(self, range_id, segment, offset):
+            return (range_id << _RANGE_SHIFT) | (segment << _OFFSET_BITS) | offset
 
-    def encode_rid(self, range_id, segment, offset):
-        return range_id * Config.range_cap + segment * Config.records_per_range + offset
+        def decode_rid(self, rid: int):
+            return (
+                rid >> _RANGE_SHIFT,
+                (rid >> _OFFSET_BITS) & _SEGMENT_MASK,
+                (rid >> _SLOT_BITS) & _PAGE_MASK,
+                rid & _SLOT_MASK,
+            )
+    else:
+        def encode_rid(self, range_id, segment, offset):
+            return range_id * Config.range_cap + segment * Config.records_per_range + offset
 
-    def decode_rid(self, rid: int):
-        range_id = rid // Config.range_cap
-        segment_block = rid % Config.range_cap
-        segment = segment_block // Config.records_per_range
-        offset = segment_block % Config.records_per_range
-        page_index = offset // Config.records_per_page
-        slot_index = offset % Config.records_per_page
-        return range_id, segment, page_index, slot_index
+        def decode_rid(self, rid: int):
+            range_id = rid // Config.range_cap
+            segment_block = rid % Config.range_cap
+            segment = segment_block // Config.records_per_range
+            offset = segment_block % Config.records_per_range
+            page_index = offset // Config.records_per_page
+            slot_index = offset % Config.records_per_page
+            return range_id, segment, page_index, slot_index
 
 
+    def tail_sequence(self, tail_rid: int):
+        """
+        Gets the position of a tail record among all tail records of its range
+        :param tail_rid: int - the RID of the tail record
+        :return: int - the tail sequence number, comparable against a page's TPS
+        """
+        return tail_rid % Config.range_cap - Config.tail_segment * Config.records_per_range
+
+    def get_tail_page(self, range_id: int, sequence: int):
+        """
+        Finds the logical tail page holding a tail sequence number
+        :param range_id: int - the page range of the tail record
+        :param sequence: int - the tail sequence number within the range
+        :return: tuple - (TailPage, slot_index)
+        """
+        segment, offset = divmod(sequence, Config.records_per_range)
+        page_index, slot_index = divmod(offset, Config.records_per_page)
+        return self.page_directory[range_id][Config.tail_segment + segment][page_index], slot_index
+
+    def iter_tail_pages(self, range_id: int):
+        """
+        Iterates every logical tail page of a range, oldest first
+        :param range_id: int - the page range to walk
+        :return: Iterator[TailPage]
+        """
+        for tail_pages in self.page_directory[range_id][Config.tail_segment :]:
+            yield from tail_pages
+
     def add_record(self, columns: list[int], is_tail: bool = False, base_rid: int = Config.null_value):
         """
         Adds a record to the page directory
@@ -58,6 +209,10 @@ class PageDirectory:
         :param is_tail: bool - whether the record is a tail record
         :param base_rid: int - the RID of the base record, only used for tail records
         """
+        with self.lock:
+            return self._append_record(columns, is_tail, base_rid)
+
+    def _append_record(self, columns: list[int], is_tail: bool, base_rid: int):
         expected_len = (Config.tail_meta_columns if is_tail else Config.base_meta_columns) + self.num_columns
         num_columns = len(columns)
         if num_columns != expected_len:
@@ -71,42 +226,76 @@ class PageDirectory:
             )
 
         if not is_tail:
-            range_id = self.num_base_records // Config.records_per_range
+            partition = self.partition_of(columns[Config.base_meta_columns + self.key_column])
+            for range_id in self.partition_ranges[partition]:
+                free_rid = self._take_free_slot(range_id)
+                if free_rid is not None:
+                    return self._reuse_free_slot(columns, free_rid)
+            range_id = self._base_range(partition)
             offset = self.base_offsets[range_id]
-            rid = self.encode_rid(range_id, 0, offset)
+            rid = self.encode_rid(range_id, Config.base_segment, offset)
             self.base_offsets[range_id] += 1
             columns[Config.indirection_column] = Config.null_value
             columns[Config.schema_encoding_column] = 0
         else:
             base_range = self.decode_rid(base_rid)[0]
-            offset = self.tail_offsets[base_range]
-            if offset >= Config.records_per_range:
-                raise RuntimeError("Tail range is full; merge required before inserting more tail records")
-            rid = self.encode_rid(base_range, 1, offset)
+            new_key = columns[Config.tail_meta_columns + self.key_column]
+            if new_key != Config.null_value and self.partition_of(new_key) != self.range_partitions[base_range]:
+                # Ranges only hold their partition's keys, which key pruning relies on.
+                raise ValueError(f"Key {new_key} belongs to another partition than the record")
+            if new_key != Config.null_value:
+                self.key_updated = True
+            tail_segment, offset = divmod(self.tail_offsets[base_range], Config.records_per_range)
+            tail_segment += Config.tail_segment
+            if tail_segment >= Config.segments_per_range:
+                raise RuntimeError("Tail segments of the range are exhausted")
+            rid = self.encode_rid(base_range, tail_segment, offset)
             self.tail_offsets[base_range] += 1
-            columns[Config.schema_encoding_column] = self.build_schema_encoding(columns)
             base_record = self.get_record_from_rid(base_rid)
-            if base_record[Config.indirection_column] != Config.null_value:
-                columns[Config.indirection_column] = base_record[Config.indirection_column]
+            previous_rid = base_record[Config.indirection_column]
+            if self.cumulative and previous_rid not in (Config.null_value, Config.deleted_record_value):
+                merged_tps = self.page_directory[base_range][Config.base_segment][self.decode_rid(base_rid)[2]].tps
+                if merged_tps and self.tail_sequence(previous_rid) < merged_tps:
+                    # The previous tail is folded into the base, so this one starts afresh.
+                    self.tail_restarts.setdefault(base_rid, []).append(len(self.version_tails.get(base_rid, ())))
+                else:
+                    # Carry forward every column the previous tail holds that this update leaves alone.
+                    previous_tail = self.get_record_from_rid(previous_rid)
+                    for column_index in range(Config.tail_meta_columns, expected_len):
+                        if columns[column_index] == Config.null_value:
+                            columns[column_index] = previous_tail[column_index]
+            columns[Config.schema_encoding_column] = self.build_schema_encoding(columns)
+            if previous_rid != Config.null_value:
+                columns[Config.indirection_column] = previous_rid
             else:
                 columns[Config.indirection_column] = base_rid
             columns[Config.base_rid_column] = base_rid
 
-        columns[Config.timestamp_column] = int(time())
-        range_id, _, page_index, _ = self.decode_rid(rid)
-        segment_key = "tail" if is_tail else "base"
+        columns[Config.timestamp_column] = commit_clock.tick()
+        range_id, segment, page_index, _ = self.decode_rid(rid)
+        segments = self.page_directory[range_id]
+        while segment >= len(segments):
+            segments.append([])
+        segment_pages = segments[segment]
         
-        while page_index >= len(self.page_directory[range_id][segment_key]):
-            # Each logical page holds one columnar Page per column (meta + data).
-            self.page_directory[range_id][segment_key].append(
-                [Page() for _ in range(num_columns)]
+        while page_index >= len(segment_pages):
+            # Base logical pages hold one columnar Page per column (meta + data);
+            # tail logical pages only store the data columns each record updates.
+            segment_pages.append(
+                TailPage(Config.tail_meta_columns) if is_tail else BasePage(Page() for _ in range(num_columns))
             )
         
 
         columns[Config.rid_column] = rid
-        for i, value in enumerate(columns):
-            physical_page = self.page_directory[range_id][segment_key][page_index][i]
-            physical_page.write(value)
+        logical_page = segment_pages[page_index]
+        if is_tail:
+            logical_page.append(
+                columns[: Config.tail_meta_columns],
+                [value for value in columns[Config.tail_meta_columns :] if value != Config.null_value],
+            )
+        else:
+            for physical_page, value in zip(logical_page, columns):
+                physical_page.write(value)
         
         if not is_tail:
             self.num_base_records += 1
@@ -115,9 +304,206 @@ class PageDirectory:
 
         if is_tail and base_rid != Config.null_value:
             self.update_base_record(base_rid, columns)
+            tail_rids = self.version_tails.setdefault(base_rid, [])
+            tail_rids.append(rid)
+            if not self.cumulative and len(tail_rids) % Config.version_checkpoint_interval == 0:
+                self._checkpoint_version(base_rid, tail_rids)
         
         return rid
 
+    def partition_of(self, key: int):
+        """
+        Gets the key-range partition a primary key belongs to
+        :param key: int - the primary key
+        :return: int - the partition index
+        """
+        return bisect_right(self.partition_bounds, key)
+
+    def ranges_for_keys(self, start: int, end: int):
+        """
+        Gets the page ranges of every partition that can hold a key in [start, end]
+        :param start: int - the inclusive start of the key range
+        :param end: int - the inclusive end of the key range
+        :return: list[int] - the range ids, in partition order
+        """
+        return [
+            range_id
+            for partition in range(self.partition_of(start), self.partition_of(end) + 1)
+            for range_id in self.partition_ranges[partition]
+        ]
+
+    def _base_range(self, partition: int):
+        """
+        Gets the range the next base record of a partition is appended to, opening one if full
+        :param partition: int - the partition index
+        :return: int - the range id
+        """
+        ranges = self.partition_ranges[partition]
+        if not ranges or self.base_offsets[ranges[-1]] >= Config.records_per_range:
+            ranges.append(len(self.page_directory))
+            self.range_partitions.append(partition)
+            self._ensure_range(ranges[-1])
+        return ranges[-1]
+
+    def _take_free_slot(self, range_id: int):
+        """
+        Takes a reclaimed slot of a range off its free list, skipping pages being merged
+        :param range_id: int - the page range to take a slot from
+        :return: int | None - the RID of the slot, or None if no slot can be reused now
+        """
+        free_slots = self.free_slots[range_id]
+        merging_pages = self.merging_pages[range_id]
+        for position in range(len(free_slots) - 1, -1, -1):
+            if self.decode_rid(free_slots[position])[2] not in merging_pages:
+                return free_slots.pop(position)
+        return None
+
+    def _reuse_free_slot(self, columns: list[int], rid: int):
+        """
+        Writes a base record into a slot reclaimed from a deleted record
+        Pages holding free slots are kept as plain pages, in both the live page and its
+        pre-merge original, so the record's inserted values become its version 0.
+        :param columns: list[int] - the columns of the record, includes meta columns
+        :param rid: int - the reclaimed RID, taken off its range's free list
+        :return: int - the reused RID
+        """
+        range_id, _, page_index, slot_index = self.decode_rid(rid)
+        columns[Config.indirection_column] = Config.null_value
+        columns[Config.rid_column] = rid
+        columns[Config.timestamp_column] = commit_clock.tick()
+        columns[Config.schema_encoding_column] = 0
+        logical_page = self.page_directory[range_id][Config.base_segment][page_index]
+        written = set()
+        for page in (logical_page, logical_page.original):
+            for column, physical_page in enumerate(page):
+                # The RID column already holds this RID.
+                if column == Config.rid_column or id(physical_page) in written:
+                    continue
+                written.add(id(physical_page))
+                physical_page.write_slot(slot_index, columns[column])
+        return rid
+
+    def free_space(self, range_id: int):
+        """
+        Gets the base record space of a range that merges have reclaimed and not yet reused
+        :param range_id: int - the page range to inspect
+        :return: int - the bytes of free base slots in the range
+        """
+        return len(self.free_slots[range_id]) * (Config.base_meta_columns + self.num_columns) * Config.int_size
+
+    def add_records(self, rows: list[list[int]]):
+        """
+        Appends a batch of base records, filling whole column pages per pass
+        :param rows: list[list[int]] - base records, each including meta columns
+        :return: list[int] - the RIDs assigned to the rows, in order, contiguous within a partition
+        """
+        expected_len = Config.base_meta_columns + self.num_columns
+        for columns in rows:
+            if len(columns) != expected_len:
+                raise ValueError(
+                    "Expected {expected} columns (base meta columns + {data} data columns), got {actual}".format(
+                        expected=expected_len,
+                        data=self.num_columns,
+                        actual=len(columns),
+                    )
+                )
+
+        with self.lock:
+            # The batch commits as one, under a single commit timestamp, and every row is
+            # checked above before any partition is written.
+            timestamp = commit_clock.tick()
+            if not self.partition_bounds:
+                return self._append_records(rows, 0, timestamp)
+            positions = {}
+            for position, columns in enumerate(rows):
+                partition = self.partition_of(columns[Config.base_meta_columns + self.key_column])
+                positions.setdefault(partition, []).append(position)
+            rids = [None] * len(rows)
+            for partition, partition_positions in positions.items():
+                partition_rids = self._append_records(
+                    [rows[position] for position in partition_positions], partition, timestamp
+                )
+                for position, rid in zip(partition_positions, partition_rids):
+                    rids[position] = rid
+            return rids
+
+    def _append_records(self, rows: list[list[int]], partition: int, timestamp: int):
+        expected_len = Config.base_meta_columns + self.num_columns
+        rids = []
+        position = 0
+        while position < len(rows):
+            range_id = self._base_range(partition)
+            offset = self.base_offsets[range_id]
+            page_index, slot_index = divmod(offset, Config.records_per_page)
+            count = min(len(rows) - position, Config.records_per_page - slot_index)
+            chunk = rows[position : position + count]
+
+            base_pages = self.page_directory[range_id][Config.base_segment]
+            while page_index >= len(base_pages):
+                base_pages.append(BasePage(Page() for _ in range(expected_len)))
+            logical_page = base_pages[page_index]
+
+            first_rid = self.encode_rid(range_id, Config.base_segment, offset)
+            chunk_rids = range(first_rid, first_rid + count)
+            for rid, columns in zip(chunk_rids, chunk):
+                columns[Config.indirection_column] = Config.null_value
+                columns[Config.rid_column] = rid
+                columns[Config.timestamp_column] = timestamp
+                columns[Config.schema_encoding_column] = 0
+
+            for i, physical_page in enumerate(logical_page):
+                physical_page.write_many([columns[i] for columns in chunk])
+
+            rids.extend(chunk_rids)
+            self.base_offsets[range_id] += count
+            self.num_base_records += count
+            position += count
+
+        return rids
+
+    def version_count(self, base_rid: int):
+        """
+        Gets the number of updates applied to a record
+        :param base_rid: int - the RID of the base record
+        :return: int - the number of tail records of the record
+        """
+        return len(self.version_tails.get(base_rid, ()))
+
+    def _original_data(self, base_rid: int):
+        """
+        Reads the data columns a record was inserted with, before any merge
+        :param base_rid: int - the RID of the base record
+        :return: list[int] - the original data columns
+        """
+        range_id, _, page_index, slot_index = self.decode_rid(base_rid)
+        logical_page = self.page_directory[range_id][Config.base_segment][page_index]
+        if logical_page.original is not None:
+            logical_page = logical_page.original
+        return [physical_page.read(slot_index) for physical_page in logical_page[Config.base_meta_columns :]]
+
+    def _checkpoint_version(self, base_rid: int, tail_rids: list[int]):
+        """
+        Snapshots the data columns of a record after its newest Config.version_checkpoint_interval tails
+        :param base_rid: int - the RID of the base record
+        :param tail_rids: list[int] - the record's tail RIDs, oldest first, a multiple of the interval long
+        """
+        checkpoints = self.version_checkpoints.setdefault(base_rid, [])
+        data = list(checkpoints[-1]) if checkpoints else self._original_data(base_rid)
+        self._apply_tails(data, tail_rids[-Config.version_checkpoint_interval :])
+        checkpoints.append(data)
+
+    def _apply_tails(self, data: list[int], tail_rids: list[int]):
+        """
+        Overlays the updated columns of tail records onto data columns, in order
+        :param data: list[int] - the data columns to update in place
+        :param tail_rids: list[int] - the tail records to apply, oldest first
+        """
+        for tail_rid in tail_rids:
+            tail_record = self.get_record_from_rid(tail_rid)
+            for column, value in enumerate(tail_record[Config.tail_meta_columns :]):
+                if value != Config.null_value:
+                    data[column] = value
+
     def update_base_record(self, base_rid: int, tail_columns: list[int]):
         """
         Updates a base record
@@ -126,10 +512,10 @@ class PageDirectory:
         :return: bool - whether the record was updated
         """
         range_id, _, page_index, slot_index = self.decode_rid(base_rid)
-        segment_key = "base"
-        base_indirection_page = self.page_directory[range_id][segment_key][page_index][Config.indirection_column]
+        logical_page = self.page_directory[range_id][Config.base_segment][page_index]
+        base_indirection_page = logical_page[Config.indirection_column]
         base_indirection_page.write_slot(slot_index, tail_columns[Config.rid_column])
-        base_schema_encoding_page = self.page_directory[range_id][segment_key][page_index][Config.schema_encoding_column]
+        base_schema_encoding_page = logical_page[Config.schema_encoding_column]
         base_schema_encoding = base_schema_encoding_page.read(slot_index)
         new_schema_encoding = self.build_schema_encoding(tail_columns)
         base_schema_encoding_page.write_slot(slot_index, new_schema_encoding | base_schema_encoding)
@@ -158,10 +544,10 @@ class PageDirectory:
         :return: list[int] - the columns of the record
         """
         range_id, segment, page_index, slot_index = self.decode_rid(rid)
-        segment_key = "tail" if segment else "base"
-        num_columns = (Config.tail_meta_columns if segment else Config.base_meta_columns) + self.num_columns
-        logical_page = self.page_directory[range_id][segment_key][page_index]
-        columns = [logical_page[i].read(slot_index) for i in range(num_columns)]
+        logical_page = self.page_directory[range_id][segment][page_index]
+        if segment:
+            return self.get_tail_record(logical_page, slot_index)
+        columns = [physical_page.read(slot_index) for physical_page in logical_page]
 
         # if not segment and columns[Config.indirection_column] == Config.deleted_record_value: # Deleted records should still return from this method
         #     raise RuntimeError(f"Record with RID {rid} has been deleted") 
@@ -169,6 +555,284 @@ class PageDirectory:
         return columns
 
 
+    def get_tail_record(self, tail_page: TailPage, slot_index: int):
+        """
+        Expands a sparse tail record to full width
+        :param tail_page: TailPage - the logical tail page holding the record
+        :param slot_index: int - the slot of the record within the page
+        :return: list[int] - the meta columns followed by every data column, null where not updated
+        """
+        columns = tail_page.read_meta(slot_index) + [Config.null_value] * self.num_columns
+        schema_encoding = columns[Config.schema_encoding_column]
+        if schema_encoding:
+            values = iter(tail_page.read_values(slot_index))
+            for i in range(self.num_columns):
+                if schema_encoding & (1 << (self.num_columns - i - 1)):
+                    columns[Config.tail_meta_columns + i] = next(values)
+        return columns
+
+    def get_zone_map(self, range_id: int, page_index: int, column: int, is_tail: bool = False):
+        """
+        Gets the zone map of one column of a logical page
+        :param range_id: int - the page range of the logical page
+        :param page_index: int - the index of the logical page within its segment, or among all tail pages of the range
+        :param column: int - the physical column index, including meta columns (meta only for tail pages)
+        :param is_tail: bool - whether to read the tail segment instead of the base segment
+        :return: ZoneMap - (min, max, count, sum) over the column's non-null values
+        """
+        if is_tail:
+            logical_page = self.get_tail_page(range_id, page_index * Config.records_per_page)[0]
+        else:
+            logical_page = self.page_directory[range_id][Config.base_segment][page_index]
+        return logical_page[column].zone_map()
+
+    def compress_base_pages(self, range_id: int = None):
+        """
+        Swaps the read-only columns of full base pages for compressed encoded pages
+        The indirection and schema encoding columns keep being updated, so they stay raw
+        :param range_id: int - the page range to compress, defaults to every range
+        :return: int - the number of physical pages that were replaced
+        """
+        range_ids = range(len(self.page_directory)) if range_id is None else [range_id]
+        mutable_columns = (Config.indirection_column, Config.schema_encoding_column)
+        replaced = 0
+        with self.lock:
+            for current_range in range_ids:
+                # Pages with free slots stay writable until the slots are reused, and pages a
+                # merge is rebuilding keep their physical pages, which the merged page shares.
+                skipped_pages = {self.decode_rid(rid)[2] for rid in self.free_slots[current_range]}
+                skipped_pages |= self.merging_pages[current_range]
+                for page_index, logical_page in enumerate(self.page_directory[current_range][Config.base_segment]):
+                    if page_index in skipped_pages:
+                        continue
+                    for column, physical_page in enumerate(logical_page):
+                        if column in mutable_columns or not isinstance(physical_page, Page):
+                            continue
+                        if physical_page.num_records < Config.records_per_page:
+                            continue
+                        encoded_page = EncodedPage.from_page(physical_page)
+                        if encoded_page.nbytes < physical_page.nbytes:
+                            logical_page[column] = encoded_page
+                            # Pages still used by the pre-merge original must stay readable.
+                            if logical_page.original is None or logical_page.original[column] is not physical_page:
+                                self._retired_pages[current_range].append(physical_page)
+                            replaced += 1
+        return replaced
+
+    def needs_merge(self, range_id: int):
+        """
+        Checks whether a range has accumulated enough unmerged tail records to merge
+        :param range_id: int - the page range to check
+        :return: bool - whether a merge of the range is due
+        """
+        return self.tail_offsets[range_id] - self.merged_tails[range_id] >= Config.merge_threshold
+
+    def merge_range(self, range_id: int):
+        """
+        Folds the committed tail records of a range into new base pages
+        Only full base pages are merged. The new pages are built without holding the lock,
+        reusing the live indirection and schema encoding pages, and are swapped into the
+        directory one logical page at a time together with their TPS, so concurrent readers
+        see either the old page with its old TPS or the new page with the new one.
+        Records deleted before the merge started have their slots reclaimed: once the TPS
+        covers all of their tails, the slots go on the range's free list for new inserts.
+        :param range_id: int - the page range to merge
+        :return: int - the number of base logical pages that were replaced
+        """
+        with self.lock:
+            retired, self._retired_pages[range_id] = self._retired_pages[range_id], []
+            tail_count = self.tail_offsets[range_id]
+            segments = self.page_directory[range_id]
+            deleted_pages = {self.decode_rid(rid)[2] for rid in self.deleted_rids[range_id]}
+            candidates = {
+                page_index: logical_page
+                for page_index, logical_page in enumerate(segments[Config.base_segment])
+                if logical_page[Config.rid_column].num_records == Config.records_per_page
+                and (logical_page.tps < tail_count or page_index in deleted_pages)
+            }
+            reclaimed = [rid for rid in self.deleted_rids[range_id] if self.decode_rid(rid)[2] in candidates]
+            self.deleted_rids[range_id] = [
+                rid for rid in self.deleted_rids[range_id] if self.decode_rid(rid)[2] not in candidates
+            ]
+            writable_pages = {self.decode_rid(rid)[2] for rid in self.free_slots[range_id] + reclaimed}
+            self.merging_pages[range_id] = set(candidates)
+            if not candidates:
+                # Tails of pages still filling wait for them to fill; counting them as seen
+                # keeps needs_merge from asking for this empty merge again on every update.
+                self.merged_tails[range_id] = max(self.merged_tails[range_id], tail_count)
+        # Pages retired by the previous merge have had a whole merge for readers to drain.
+        for physical_page in retired:
+            physical_page.release()
+        if not candidates:
+            return 0
+
+        # Walk the tails newest first; the first value seen per record and column wins.
+        updates = {}
+        seen = set()
+        scan_start = min(logical_page.tps for logical_page in candidates.values())
+        for sequence in range(tail_count - 1, scan_start - 1, -1):
+            tail_page, tail_slot = self.get_tail_page(range_id, sequence)
+            if tail_slot >= tail_page.num_records:
+                # Released along with the reclaimed records it belonged to.
+                continue
+            meta = tail_page.read_meta(tail_slot)
+            schema_encoding = meta[Config.schema_encoding_column]
+            base_rid = meta[Config.base_rid_column]
+            _, _, page_index, slot_index = self.decode_rid(base_rid)
+            logical_page = candidates.get(page_index)
+            if not schema_encoding or logical_page is None or sequence < logical_page.tps:
+                continue
+            values = iter(tail_page.read_values(tail_slot))
+            for column in range(self.num_columns):
+                if schema_encoding & (1 << (self.num_columns - column - 1)):
+                    value = next(values)
+                    if (base_rid, column) not in seen:
+                        seen.add((base_rid, column))
+                        updates.setdefault(page_index, {}).setdefault(column, {})[slot_index] = value
+
+        merged_pages = {}
+        for page_index, logical_page in candidates.items():
+            writable = page_index in writable_pages
+            physical_pages = list(logical_page)
+            for column, slot_values in updates.get(page_index, {}).items():
+                physical_column = Config.base_meta_columns + column
+                values = logical_page[physical_column].decode()
+                for slot_index, value in slot_values.items():
+                    values[slot_index] = value
+                physical_pages[physical_column] = self._build_read_only_page(values, writable)
+            original = logical_page if logical_page.original is None else logical_page.original
+            if writable:
+                # Reused slots are written in place, so no page of either version may be encoded.
+                copies = {}
+                physical_pages = [self._writable_page(page, copies) for page in physical_pages]
+                original = BasePage(self._writable_page(page, copies) for page in original)
+            merged_pages[page_index] = BasePage(physical_pages, tail_count, original)
+
+        with self.lock:
+            base_pages = segments[Config.base_segment]
+            for page_index, merged_page in merged_pages.items():
+                replaced_page = base_pages[page_index]
+                base_pages[page_index] = merged_page
+                kept = {id(page) for page in merged_page + merged_page.original}
+                for physical_page in replaced_page + (replaced_page.original or []):
+                    if id(physical_page) not in kept:
+                        kept.add(id(physical_page))
+                        self._retired_pages[range_id].append(physical_page)
+            self.merged_tails[range_id] = max(self.merged_tails[range_id], tail_count)
+            self.merging_pages[range_id] = set()
+            for rid in reclaimed:
+                self._reclaim_record(rid)
+            self.free_slots[range_id].extend(reclaimed)
+        return len(merged_pages)
+
+    def _reclaim_record(self, rid: int):
+        """
+        Forgets a deleted record and releases tail pages left holding only reclaimed records
+        :param rid: int - the RID of the deleted base record
+        """
+        self.version_checkpoints.pop(rid, None)
+        self.tail_restarts.pop(rid, None)
+        deleted_at = self.delete_timestamps.pop(rid, None)
+        if deleted_at is not None:
+            self.history_horizon = max(self.history_horizon, deleted_at)
+        for tail_rid in self.version_tails.pop(rid, ()):
+            range_id, segment, page_index, _ = self.decode_rid(tail_rid)
+            page_key = (range_id, segment, page_index)
+            dead_count = self.dead_tails.get(page_key, 0) + 1
+            if dead_count < Config.records_per_page:
+                self.dead_tails[page_key] = dead_count
+                continue
+            # Nothing reads a page whose records all belong to reclaimed records.
+            self.dead_tails.pop(page_key, None)
+            self.page_directory[range_id][segment][page_index].release()
+
+    def _build_read_only_page(self, values: list[int], writable: bool = False):
+        """
+        Builds a full page for merged values, compressed when that is smaller
+        :param values: list[int] - every slot of the page, in order
+        :param writable: bool - whether the page must stay a plain, writable page
+        :return: Page | EncodedPage - the page holding the values
+        """
+        page = Page()
+        page.write_many(values)
+        if writable:
+            return page
+        encoded_page = EncodedPage(values)
+        if encoded_page.nbytes < page.nbytes:
+            page.release()
+            return encoded_page
+        return page
+
+    def _writable_page(self, physical_page, copies: dict):
+        """
+        Gets a plain page holding the values of a physical page, copying encoded pages once
+        :param physical_page: Page | EncodedPage - the page to make writable
+        :param copies: dict - copies made so far, keyed by id, so shared pages stay shared
+        :return: Page - the page itself, or its plain copy
+        """
+        if isinstance(physical_page, Page):
+            return physical_page
+        if id(physical_page) not in copies:
+            copies[id(physical_page)] = self._build_read_only_page(physical_page.decode(), True)
+        return copies[id(physical_page)]
+
+    def release_pages(self):
+        """
+        Drops every base and tail page, returning their buffers to the shared pool
+        """
+        with self.lock:
+            for segments in self.page_directory:
+                for logical_page in segments[Config.base_segment]:
+                    for physical_page in logical_page + (logical_page.original or []):
+                        physical_page.release()
+                for tail_pages in segments[Config.tail_segment :]:
+                    for tail_page in tail_pages:
+                        tail_page.release()
+            for retired in self._retired_pages:
+                for physical_page in retired:
+                    physical_page.release()
+            self.page_directory.clear()
+            self.num_base_records = 0
+            self.num_tail_records = 0
+            self.base_offsets.clear()
+            self.tail_offsets.clear()
+            self.merged_tails.clear()
+            self._retired_pages.clear()
+            self.version_tails.clear()
+            self.version_checkpoints.clear()
+            self.tail_restarts.clear()
+            self.delete_timestamps.clear()
+            self.history_horizon = 0
+            self.key_updated = False
+            self.deleted_rids.clear()
+            self.free_slots.clear()
+            self.merging_pages.clear()
+            for ranges in self.partition_ranges:
+                ranges.clear()
+            self.range_partitions.clear()
+            self.dead_tails.clear()
+
+    def iter_base_pages(self, range_ids: list[int] = None):
+        """
+        Iterates over the base logical pages in RID order
+        :param range_ids: list[int] - the ranges to visit, defaults to every range
+        :return: iterator of (range_id, page_index, logical_page) tuples
+        """
+        if range_ids is None:
+            range_ids = range(len(self.page_directory))
+        for range_id in range_ids:
+            for page_index, logical_page in enumerate(self.page_directory[range_id][Config.base_segment]):
+                yield range_id, page_index, logical_page
+
+    def iter_base_rids(self):
+        """
+        Iterates over the RIDs of every base record, deleted ones included, in RID order
+        :return: iterator of int
+        """
+        for range_id, page_index, logical_page in self.iter_base_pages():
+            first_rid = self.encode_rid(range_id, Config.base_segment, page_index * Config.records_per_page)
+            yield from range(first_rid, first_rid + logical_page[Config.rid_column].num_records)
+
     def get_relative_version_of_record_from_base_rid(self, base_rid: int, version: int = -1):
         """
         Gets a cumulative updated version of a record from the table, defaults to latest (-1), 0 for base record
@@ -176,7 +840,16 @@ class PageDirectory:
         :param version: int - the relative version of the record, decrease to get older versions, defaults to latest
         :return: list[int] - the columns of the record, with a tail record
         """
-        base_record = self.get_record_from_rid(base_rid)
+        if version == -1:
+            return self.get_cumulative_updated_record_from_base_rid(base_rid)
+
+        # Versions replay tails over the values the record was inserted with, which a
+        # merge keeps in the original base pages.
+        range_id, _, page_index, slot_index = self.decode_rid(base_rid)
+        logical_page = self.page_directory[range_id][Config.base_segment][page_index]
+        if logical_page.original is not None:
+            logical_page = logical_page.original
+        base_record = [physical_page.read(slot_index) for physical_page in logical_page]
         result_record = (
             base_record[: Config.base_meta_columns]
             + [base_record[Config.rid_column]]
@@ -186,40 +859,81 @@ class PageDirectory:
         if version == 0:
             return result_record
 
-        if version == -1:
-            return self.get_cumulative_updated_record_from_base_rid(base_rid)
-
-        # Gather the tail chain so we can walk versions from oldest to newest.
-        tails_newest_first = []
-        current_rid = base_record[Config.indirection_column]
-        while current_rid != base_rid:
-            tail_record = self.get_record_from_rid(current_rid)
-            tails_newest_first.append(tail_record)
-            current_rid = tail_record[Config.indirection_column]
-
-        tails_oldest_first = tails_newest_first[::-1]
-        data_column_count = self.num_columns + Config.tail_meta_columns
+        tail_rids = self.version_tails.get(base_rid, ())
         # version = -2 means "latest minus one", etc.
         if version < -1:
             skip_newest = (-1 - version)
-            apply_count = max(0, len(tails_oldest_first) - skip_newest)
+            apply_count = max(0, len(tail_rids) - skip_newest)
         else:
-            apply_count = min(version, len(tails_oldest_first))
-
-        for tail_record in tails_oldest_first[:apply_count]:
-            for column_index in range(Config.tail_meta_columns, data_column_count):
-                if tail_record[column_index] != Config.null_value:
-                    result_record[column_index] = tail_record[column_index]
+            apply_count = min(version, len(tail_rids))
+        if not apply_count:
+            return result_record
 
+        data = result_record[Config.tail_meta_columns :]
+        if self.cumulative:
+            # The target version's tail carries every update since the latest restart before
+            # it, and the tail just before each restart carries the updates before that one.
+            restarts = [restart for restart in self.tail_restarts.get(base_rid, ()) if restart < apply_count]
+            self._apply_tails(data, [tail_rids[restart - 1] for restart in restarts] + [tail_rids[apply_count - 1]])
+        else:
+            checkpoint_index = apply_count // Config.version_checkpoint_interval
+            replay_from = checkpoint_index * Config.version_checkpoint_interval
+            if checkpoint_index:
+                data = list(self.version_checkpoints[base_rid][checkpoint_index - 1])
+            self._apply_tails(data, tail_rids[replay_from:apply_count])
+        result_record[Config.tail_meta_columns :] = data
         return result_record
 
+    def get_record_as_of_from_base_rid(self, base_rid: int, timestamp: int):
+        """
+        Gets the version of a record that was current at a commit timestamp
+        The record's tails are in commit order, so the number of updates committed by then
+        is found by binary search over their timestamps, reading O(log n) tail records.
+        :param base_rid: int - the RID of the base record
+        :param timestamp: int - the commit timestamp to read as of, inclusive
+        :return: list[int] | None - the record as get_relative_version_of_record_from_base_rid
+            lays it out, or None when it was not inserted yet or already deleted at that time
+        :raises ValueError: if the timestamp is before the history horizon
+        """
+        if timestamp < self.history_horizon:
+            raise ValueError("History before the latest reclaimed delete is gone")
+        range_id, _, page_index, slot_index = self.decode_rid(base_rid)
+        logical_page = self.page_directory[range_id][Config.base_segment][page_index]
+        if logical_page[Config.timestamp_column].read(slot_index) > timestamp:
+            return None
+        deleted_at = self.delete_timestamps.get(base_rid)
+        if deleted_at is None and logical_page[Config.indirection_column].read(slot_index) == Config.deleted_record_value:
+            # Reclaimed by a merge; its history is gone.
+            return None
+        if deleted_at is not None and deleted_at <= timestamp:
+            return None
+
+        tail_rids = self.version_tails.get(base_rid, ())
+        low, high = 0, len(tail_rids)
+        while low < high:
+            middle = (low + high) // 2
+            _, segment, tail_index, tail_slot = self.decode_rid(tail_rids[middle])
+            tail_page = self.page_directory[range_id][segment][tail_index]
+            if tail_page[Config.timestamp_column].read(tail_slot) <= timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        record = self.get_relative_version_of_record_from_base_rid(base_rid, low)
+        # The version existed at that time, whatever has happened to the record since.
+        record[Config.indirection_column] = tail_rids[low - 1] if low else Config.null_value
+        return record
+
     def get_cumulative_updated_record_from_base_rid(self, base_rid: int):
         """
         Gets a cumulative updated record from the table
         :param base_rid: int - the RID of the base record
         :return: list[int] - the columns of the record
         """
-        base_record = self.get_record_from_rid(base_rid)
+        range_id, _, page_index, slot_index = self.decode_rid(base_rid)
+        # The logical page carries its own TPS, so both come from the same merge.
+        logical_page = self.page_directory[range_id][Config.base_segment][page_index]
+        merged_tps = logical_page.tps
+        base_record = [physical_page.read(slot_index) for physical_page in logical_page]
         result_record = (
             base_record[: Config.base_meta_columns]
             + [base_record[Config.rid_column]]
@@ -229,10 +943,21 @@ class PageDirectory:
         data_column_count = self.num_columns + Config.tail_meta_columns
 
         indirection_rid = base_record[Config.indirection_column]
-        if indirection_rid == Config.null_value:
+        if indirection_rid == Config.null_value or indirection_rid == Config.deleted_record_value:
+            return result_record
+        if merged_tps and self.tail_sequence(indirection_rid) < merged_tps:
+            # Every update of this record is already folded into the merged base.
+            return result_record
+        if self.cumulative:
+            newest_tail = self.get_record_from_rid(indirection_rid)
+            for column_index in range(Config.tail_meta_columns, data_column_count):
+                if newest_tail[column_index] != Config.null_value:
+                    result_record[column_index] = newest_tail[column_index]
             return result_record
         schema_encoding = base_record[Config.schema_encoding_column]
         while schema_encoding != 0 and indirection_rid != base_rid:
+            if merged_tps and self.tail_sequence(indirection_rid) < merged_tps:
+                break
             current_record = self.get_record_from_rid(indirection_rid)
             indirection_rid = current_record[Config.indirection_column]
             for column_index in range(Config.tail_meta_columns, data_column_count):
@@ -242,20 +967,158 @@ class PageDirectory:
                     schema_encoding &= ~bit_mask
         return result_record
 
+    def get_projected_record_from_base_rid(self, base_rid: int, projected_columns: list[int]):
+        """
+        Gets the latest version of the requested columns of a record
+        Only the indirection and schema encoding meta pages and the requested data pages are
+        read, and tail records are visited only while a requested column is still unresolved.
+        :param base_rid: int - the RID of the base record
+        :param projected_columns: list[int] - 1 for each data column to read, 0 to skip it
+        :return: list[int] - the record in the layout of get_cumulative_updated_record_from_base_rid,
+            with the timestamp and every column that was not requested set to null
+        """
+        range_id, _, page_index, slot_index = self.decode_rid(base_rid)
+        logical_page = self.page_directory[range_id][Config.base_segment][page_index]
+        merged_tps = logical_page.tps
+        indirection_rid = logical_page[Config.indirection_column].read(slot_index)
+        schema_encoding = logical_page[Config.schema_encoding_column].read(slot_index)
+        result_record = [Config.null_value] * (Config.tail_meta_columns + self.num_columns)
+        result_record[Config.indirection_column] = indirection_rid
+        result_record[Config.rid_column] = base_rid
+        result_record[Config.schema_encoding_column] = schema_encoding
+        result_record[Config.base_rid_column] = base_rid
+
+        requested = 0
+        for column, include in enumerate(projected_columns):
+            if include:
+                requested |= 1 << (self.num_columns - column - 1)
+                result_record[Config.tail_meta_columns + column] = logical_page[Config.base_meta_columns + column].read(
+                    slot_index
+                )
+
+        if indirection_rid == Config.null_value or indirection_rid == Config.deleted_record_value:
+            return result_record
+        # Only requested columns that some tail has updated need a tail read.
+        pending = schema_encoding & requested
+        while pending and indirection_rid != base_rid:
+            if merged_tps and self.tail_sequence(indirection_rid) < merged_tps:
+                break
+            _, segment, tail_index, tail_slot = self.decode_rid(indirection_rid)
+            tail_page = self.page_directory[range_id][segment][tail_index]
+            tail_schema = tail_page[Config.schema_encoding_column].read(tail_slot)
+            found = tail_schema & pending
+            if found:
+                self._read_tail_values(tail_page, tail_slot, tail_schema, found, result_record)
+                pending &= ~found
+            if self.cumulative:
+                # The newest tail carries every column updated since the last merge.
+                break
+            indirection_rid = tail_page[Config.indirection_column].read(tail_slot)
+        return result_record
+
+    def _read_tail_values(self, tail_page: TailPage, tail_slot: int, tail_schema: int, found: int, result_record: list[int]):
+        """
+        Copies the values of a tail record for the columns in found into a result record
+        :param tail_page: TailPage - the logical tail page holding the record
+        :param tail_slot: int - the slot of the record within the page
+        :param tail_schema: int - the schema encoding of the tail record
+        :param found: int - schema bits of the columns to copy, a subset of tail_schema
+        :param result_record: list[int] - the record to fill, in the tail record layout
+        """
+        for column in range(self.num_columns):
+            if found & (1 << (self.num_columns - column - 1)):
+                # Values are stored in column order, one per set schema bit.
+                position = bin(tail_schema >> (self.num_columns - column)).count("1")
+                result_record[Config.tail_meta_columns + column] = tail_page.read_value(tail_slot, position)
+
+    def get_projected_records_from_base_rids(self, base_rids: list[int], projected_columns: list[int]):
+        """
+        Gets the latest version of the requested columns of many records
+        The RIDs are sorted and grouped by base page, so every needed column page is read
+        once per group as one slot range. Tail chains are then resolved a step at a time
+        for all records together, visiting the tail records of each step in RID order.
+        :param base_rids: list[int] - the RIDs of the base records
+        :param projected_columns: list[int] - 1 for each data column to read, 0 to skip it
+        :return: list[list[int]] - one record per RID, in the order given, laid out as in
+            get_projected_record_from_base_rid
+        """
+        columns = [column for column, include in enumerate(projected_columns) if include]
+        requested = 0
+        for column in columns:
+            requested |= 1 << (self.num_columns - column - 1)
+        record_width = Config.tail_meta_columns + self.num_columns
+
+        records = [None] * len(base_rids)
+        # (tail RID, position in records, pending schema bits, TPS of the base page)
+        chains = []
+        decoded = [self.decode_rid(base_rid) for base_rid in base_rids]
+        order = sorted(range(len(base_rids)), key=base_rids.__getitem__)
+        for (range_id, page_index), group in groupby(order, key=lambda i: (decoded[i][0], decoded[i][2])):
+            group = [(i, decoded[i][3]) for i in group]
+            logical_page = self.page_directory[range_id][Config.base_segment][page_index]
+            first_slot = group[0][1]
+            end_slot = group[-1][1] + 1
+            indirections = logical_page[Config.indirection_column].read_range(first_slot, end_slot)
+            schemas = logical_page[Config.schema_encoding_column].read_range(first_slot, end_slot)
+            column_values = [
+                logical_page[Config.base_meta_columns + column].read_range(first_slot, end_slot) for column in columns
+            ]
+            for i, slot_index in group:
+                base_rid = base_rids[i]
+                relative_slot = slot_index - first_slot
+                indirection_rid = indirections[relative_slot]
+                schema_encoding = schemas[relative_slot]
+                record = [Config.null_value] * record_width
+                record[Config.indirection_column] = indirection_rid
+                record[Config.rid_column] = base_rid
+                record[Config.schema_encoding_column] = schema_encoding
+                record[Config.base_rid_column] = base_rid
+                for column, values in zip(columns, column_values):
+                    record[Config.tail_meta_columns + column] = values[relative_slot]
+                records[i] = record
+                pending = schema_encoding & requested
+                if pending and indirection_rid != Config.null_value and indirection_rid != Config.deleted_record_value:
+                    chains.append((indirection_rid, i, pending, logical_page.tps))
+
+        while chains:
+            chains.sort()
+            next_chains = []
+            for tail_rid, i, pending, merged_tps in chains:
+                if tail_rid == base_rids[i] or (merged_tps and self.tail_sequence(tail_rid) < merged_tps):
+                    continue
+                range_id, segment, tail_index, tail_slot = self.decode_rid(tail_rid)
+                tail_page = self.page_directory[range_id][segment][tail_index]
+                tail_schema = tail_page[Config.schema_encoding_column].read(tail_slot)
+                found = tail_schema & pending
+                if found:
+                    self._read_tail_values(tail_page, tail_slot, tail_schema, found, records[i])
+                    pending &= ~found
+                if pending and not self.cumulative:
+                    next_rid = tail_page[Config.indirection_column].read(tail_slot)
+                    next_chains.append((next_rid, i, pending, merged_tps))
+            chains = next_chains
+        return records
+
     def delete_record(self, rid: int):
         """
         Logical deletion of a record from the table
         :param rid: int - the RID of the record
         :return: bool - whether the record was deleted
         """
-        if rid < 0 or rid >= self.num_base_records:
+        with self.lock:
+            return self._tombstone_record(rid)
+
+    def _tombstone_record(self, rid: int):
+        if rid < 0:
             raise ValueError(f"Invalid RID: {rid}")
 
         range_id, segment, page_index, slot_index = self.decode_rid(rid)
         if segment:
             raise ValueError("A tail record RID cannot be deleted")
 
-        base_pages = self.page_directory.get(range_id, {}).get("base")
+        if range_id >= len(self.page_directory):
+            raise ValueError(f"RID {rid} does not map to a loaded page range")
+        base_pages = self.page_directory[range_id][Config.base_segment]
         if not base_pages or page_index >= len(base_pages):
             raise ValueError(f"RID {rid} does not map to a loaded base page")
 
@@ -274,6 +1137,8 @@ class PageDirectory:
             return False
 
         indirection_page.write_slot(slot_index, Config.deleted_record_value)
+        self.delete_timestamps[rid] = commit_clock.tick()
+        self.deleted_rids[range_id].append(rid)
         return True
 
 class Table:
@@ -281,14 +1146,42 @@ class Table:
     :param name: string         #Table name
     :param num_columns: int     #Number of Columns: all columns are integer
     :param key: int             #Index of table key in columns
+    :param dictionary_columns: list[int]  #Columns stored as dictionary codes (low-cardinality columns)
+    :param cumulative_tails: bool  #Whether each tail record carries every column updated since its base page was last merged
+    :param row_cache_bytes: int  #Byte budget of the cache of latest record versions, 0 to disable it
+    :param partition_bounds: list[int]  #Primary key split points of the table's key-range partitions, updates cannot move a key across them
     """
-    def __init__(self, name, num_columns, key):
+    def __init__(
+        self,
+        name,
+        num_columns,
+        key,
+        dictionary_columns=None,
+        cumulative_tails=False,
+        row_cache_bytes=0,
+        partition_bounds=None,
+    ):
         self.name = name
         self.key = key
         self.num_columns = num_columns
-        self.page_directory = PageDirectory(num_columns, Config.initial_page_ranges)
+        self.dictionaries = [None] * num_columns
+        for column in dictionary_columns or ():
+            if not 0 <= column < num_columns:
+                raise ValueError(f"Column {column} out of bounds for dictionary encoding")
+            if column == key:
+                raise ValueError("The primary key column cannot be dictionary encoded")
+            self.dictionaries[column] = ColumnDictionary()
+        self.dictionary_columns = [column for column, dictionary in enumerate(self.dictionaries) if dictionary is not None]
+        self.partition_bounds = sorted(partition_bounds or ())
+        self.page_directory = PageDirectory(
+            num_columns, Config.initial_page_ranges, cumulative_tails, self.partition_bounds, key
+        )
         self.index = Index(self)
-        pass
+        # Merges never change a record's latest values, so only deletes invalidate cached rows.
+        self.row_cache = RowCache(row_cache_bytes) if row_cache_bytes else None
+        self.merge_lock = RLock()
+        # Each key-range partition runs its own background merges.
+        self.merge_threads = {}
 
     def get_record(self, rid: int):
         """
@@ -296,7 +1189,11 @@ class Table:
         :param rid: int - the RID of the record
         :return: list[int] - the columns of the record
         """
-        return self.page_directory.get_record_from_rid(rid)
+        record = self.page_directory.get_record_from_rid(rid)
+        if self.dictionary_columns:
+            segment = self.page_directory.decode_rid(rid)[1]
+            self._decode_columns(record, Config.tail_meta_columns if segment else Config.base_meta_columns)
+        return record
 
     def get_relative_version_of_record(self, rid: int, version: int = -1):
         """
@@ -305,7 +1202,22 @@ class Table:
         :param version: int - the relative version of the record, increase to get older versions, defaults to latest
         :return: list[int] - the columns of the record
         """
-        return self.page_directory.get_relative_version_of_record_from_base_rid(rid, version)
+        record = self.page_directory.get_relative_version_of_record_from_base_rid(rid, version)
+        if self.dictionary_columns:
+            self._decode_columns(record, Config.tail_meta_columns)
+        return record
+
+    def get_record_as_of(self, rid: int, timestamp: int):
+        """
+        Gets the version of a record that was current at a commit timestamp
+        :param rid: int - the RID of the base record
+        :param timestamp: int - the commit timestamp to read as of, from lstore.clock.commit_clock
+        :return: list[int] | None - the columns of the record, None if it did not exist at that time
+        """
+        record = self.page_directory.get_record_as_of_from_base_rid(rid, timestamp)
+        if record is not None and self.dictionary_columns:
+            self._decode_columns(record, Config.tail_meta_columns)
+        return record
 
     def get_cumulative_updated_record(self, rid: int):
         """
@@ -313,7 +1225,245 @@ class Table:
         :param rid: int - the RID of the record
         :return: list[int] - the columns of the record
         """
-        return self.page_directory.get_cumulative_updated_record_from_base_rid(rid)
+        if self.row_cache is not None:
+            record = self.row_cache.get(rid)
+            if record is not None:
+                return record
+        record = self.page_directory.get_cumulative_updated_record_from_base_rid(rid)
+        if self.dictionary_columns:
+            self._decode_columns(record, Config.tail_meta_columns)
+        if self.row_cache is not None:
+            self.row_cache.put(rid, record)
+        return record
+
+    def get_projected_record(self, rid: int, projected_columns: list[int]):
+        """
+        Gets the latest version of only the requested columns of a record
+        :param rid: int - the RID of the base record
+        :param projected_columns: list[int] - 1 for each data column to read, 0 to skip it
+        :return: list[int] - the columns of the record, null where not requested
+        """
+        if self.row_cache is not None:
+            record = self.row_cache.get(rid)
+            if record is None:
+                # Misses load the whole latest version so the cache can answer any projection.
+                record = self.get_cumulative_updated_record(rid)
+            return self._project_record(record, projected_columns)
+        record = self.page_directory.get_projected_record_from_base_rid(rid, projected_columns)
+        if self.dictionary_columns:
+            self._decode_columns(record, Config.tail_meta_columns)
+        return record
+
+    def get_records(self, rids: list[int], projected_columns: list[int]):
+        """
+        Gets the latest version of the requested columns of many records, reading page by page
+        :param rids: list[int] - the RIDs of the base records
+        :param projected_columns: list[int] - 1 for each data column to read, 0 to skip it
+        :return: list[list[int]] - one record per RID, in the order given, null where not requested
+        """
+        if len(rids) == 1:
+            # Grouping buys nothing for a point lookup.
+            return [self.get_projected_record(rids[0], projected_columns)]
+        if self.row_cache is None:
+            records = self.page_directory.get_projected_records_from_base_rids(rids, projected_columns)
+            if self.dictionary_columns:
+                for record in records:
+                    self._decode_columns(record, Config.tail_meta_columns)
+            return records
+
+        # Misses load whole latest versions so the cache can answer any later projection.
+        records = [self.row_cache.get(rid) for rid in rids]
+        missing = [i for i, record in enumerate(records) if record is None]
+        fetched = self.page_directory.get_projected_records_from_base_rids(
+            [rids[i] for i in missing], [1] * self.num_columns
+        )
+        for i, record in zip(missing, fetched):
+            if self.dictionary_columns:
+                self._decode_columns(record, Config.tail_meta_columns)
+            self.row_cache.put(rids[i], record)
+            records[i] = record
+        return [self._project_record(record, projected_columns) for record in records]
+
+    def _project_record(self, record: list[int], projected_columns: list[int]):
+        """
+        Nulls the columns of a full latest record that a projected fetch would not read
+        :param record: list[int] - a record laid out as by get_cumulative_updated_record, modified in place
+        :param projected_columns: list[int] - 1 for each data column to keep, 0 to null it
+        :return: list[int] - the record
+        """
+        record[Config.timestamp_column] = Config.null_value
+        for column, include in enumerate(projected_columns):
+            if not include:
+                record[Config.tail_meta_columns + column] = Config.null_value
+        return record
+
+    def _encode_columns(self, columns: list[int], meta_columns: int):
+        """
+        Copies a record with its dictionary columns replaced by their codes
+        :param columns: list[int] - the record, including meta columns
+        :param meta_columns: int - the number of meta columns preceding the data columns
+        :return: list[int] - the encoded copy
+        """
+        encoded = list(columns)
+        for column in self.dictionary_columns:
+            encoded[meta_columns + column] = self.dictionaries[column].encode(encoded[meta_columns + column])
+        return encoded
+
+    def _decode_columns(self, record: list[int], meta_columns: int):
+        """
+        Replaces the dictionary codes of a record with their values in place
+        :param record: list[int] - the record, including meta columns
+        :param meta_columns: int - the number of meta columns preceding the data columns
+        """
+        for column in self.dictionary_columns:
+            record[meta_columns + column] = self.dictionaries[column].decode(record[meta_columns + column])
+
+    def iter_rows_for_index(self, column: int):
+        """
+        Iterates over the latest value of one column of every live record, for index builds
+        :param column: int - the data column to read
+        :return: iterator of (base_rid, value) tuples in RID order
+        """
+        for rids, (values,) in self.scan([column]):
+            yield from zip(rids, values)
+
+    def scan(self, columns: list[int], predicate: list[tuple] = None, batch_size: int = Config.records_per_page):
+        """
+        Streams the latest values of some columns of every live record, page by page
+        Each base page's columns are read once. Only slots whose requested or filtered
+        columns were updated after the page's last merge go through the tail chain.
+        Predicates are checked on the page values before any row is built, and a page
+        whose zone maps rule a predicate out is skipped unread.
+        :param columns: list[int] - the data columns to return, in the order wanted
+        :param predicate: list[tuple] - (column, operator, value) comparisons that must all hold,
+            with operator one of ==, !=, <, <=, > and >=
+        :param batch_size: int - the most records per batch
+        :return: iterator of (rids, values) batches where values[i] lists the values of columns[i]
+        """
+        predicate = list(predicate or ())
+        for _, operator, _ in predicate:
+            if operator not in _PREDICATE_OPERATORS:
+                raise ValueError(f"Unsupported scan operator {operator!r}")
+        directory = self.page_directory
+        needed = sorted(set(columns) | {column for column, _, _ in predicate})
+        needed_mask = 0
+        for column in needed:
+            needed_mask |= 1 << (self.num_columns - column - 1)
+        projection = [1 if column in needed else 0 for column in range(self.num_columns)]
+
+        # Predicates on the key narrow the scan to the partitions that can match. This holds
+        # for updated keys too, as the page directory rejects updates across partitions.
+        low, high = -(2**63), 2**63 - 1
+        for column, operator, value in predicate:
+            if column == self.key:
+                if operator in ("==", ">=", ">"):
+                    low = max(low, value if operator != ">" else value + 1)
+                if operator in ("==", "<=", "<"):
+                    high = min(high, value if operator != "<" else value - 1)
+
+        batch_rids = []
+        batch_values = [[] for _ in columns]
+        for range_id, page_index, logical_page in directory.iter_base_pages(directory.ranges_for_keys(low, high)):
+            num_records = logical_page[Config.rid_column].num_records
+            if not num_records:
+                continue
+            merged_tps = logical_page.tps
+            indirections = logical_page[Config.indirection_column].read_range(0, num_records)
+            schemas = logical_page[Config.schema_encoding_column].read_range(0, num_records)
+            updated_slots = [
+                slot_index
+                for slot_index in range(num_records)
+                if schemas[slot_index] & needed_mask
+                and indirections[slot_index] not in (Config.null_value, Config.deleted_record_value)
+                and (not merged_tps or directory.tail_sequence(indirections[slot_index]) >= merged_tps)
+            ]
+
+            # Base values answer every slot unless an unmerged tail touched the column.
+            if any(
+                self.dictionaries[column] is None
+                and _zone_map_excludes(logical_page[Config.base_meta_columns + column].zone_map(), operator, value)
+                and not any(schemas[slot_index] & (1 << (self.num_columns - column - 1)) for slot_index in updated_slots)
+                for column, operator, value in predicate
+            ):
+                continue
+
+            values = {column: logical_page[Config.base_meta_columns + column].decode() for column in needed}
+            if updated_slots:
+                first_rid = directory.encode_rid(range_id, Config.base_segment, page_index * Config.records_per_page)
+                latest = directory.get_projected_records_from_base_rids(
+                    [first_rid + slot_index for slot_index in updated_slots], projection
+                )
+                for slot_index, record in zip(updated_slots, latest):
+                    for column in needed:
+                        values[column][slot_index] = record[Config.tail_meta_columns + column]
+            for column in needed:
+                dictionary = self.dictionaries[column]
+                if dictionary is not None:
+                    values[column] = [dictionary.decode(code) for code in values[column]]
+
+            matches = [
+                slot_index
+                for slot_index in range(num_records)
+                if indirections[slot_index] != Config.deleted_record_value
+                and all(
+                    _PREDICATE_OPERATORS[operator](values[column][slot_index], value)
+                    for column, operator, value in predicate
+                )
+            ]
+            if not matches:
+                continue
+            first_rid = directory.encode_rid(range_id, Config.base_segment, page_index * Config.records_per_page)
+            batch_rids.extend(first_rid + slot_index for slot_index in matches)
+            for column, column_values in zip(columns, batch_values):
+                page_values = values[column]
+                column_values.extend(page_values[slot_index] for slot_index in matches)
+            while len(batch_rids) >= batch_size:
+                yield batch_rids[:batch_size], [column_values[:batch_size] for column_values in batch_values]
+                batch_rids = batch_rids[batch_size:]
+                batch_values = [column_values[batch_size:] for column_values in batch_values]
+        if batch_rids:
+            yield batch_rids, batch_values
+
+    def sum_from_zone_maps(self, start: int, end: int, column: int):
+        """
+        Answers as much of a key-range sum as possible from base page zone maps
+        :param start: int - the inclusive start of the key range
+        :param end: int - the inclusive end of the key range
+        :param column: int - the data column to aggregate
+        :return: tuple - (total, found_any, answered_pages, complete) where answered_pages is the
+            set of (range_id, page_index) pages already summed and complete is True when no
+            other page can hold a record in the range
+        """
+        key_column = Config.base_meta_columns + self.key
+        value_column = Config.base_meta_columns + column
+        total = 0
+        found_any = False
+        answered_pages = set()
+        complete = True
+        # Only partitions whose key range overlaps the query can hold a matching record.
+        range_ids = self.page_directory.ranges_for_keys(start, end)
+        for range_id, page_index, logical_page in self.page_directory.iter_base_pages(range_ids):
+            keys = logical_page[key_column].zone_map()
+            if keys.count == 0:
+                continue
+            # A page with no indirection set has never been updated or deleted.
+            clean = logical_page[Config.indirection_column].non_null_count == 0
+            if clean and (keys.max < start or keys.min > end):
+                continue
+            if clean and start <= keys.min and keys.max <= end:
+                values = logical_page[value_column].zone_map()
+                if values.count:
+                    dictionary = self.dictionaries[column]
+                    if dictionary is None:
+                        total += values.sum
+                    else:
+                        # The page holds codes, so sum the values behind its code histogram.
+                        total += dictionary.sum_codes(Counter(logical_page[value_column].decode()))
+                    found_any = True
+                answered_pages.add((range_id, page_index))
+                continue
+            complete = False
+        return total, found_any, answered_pages, complete
 
     def insert_record(self, columns: list[int], is_tail: bool = False, base_rid: int = Config.null_value):
         """
@@ -322,26 +1472,91 @@ class Table:
         :param base_rid: int - the RID of the base record, only used for tail records
         :return: int - the RID of the record
         """
-        prior_data = None
+        prior_data = updated_data = None
         if is_tail:
-            prior_data = self.get_cumulative_updated_record(base_rid)[
-                Config.tail_meta_columns : Config.tail_meta_columns + self.num_columns
-            ]
+            # Only updated columns that are indexed or dictionary encoded need their old
+            # value, and only those columns are read from the current version.
+            updated_data = [None] * self.num_columns
+            tracked_columns = [0] * self.num_columns
+            for column, value in enumerate(columns[Config.tail_meta_columns : Config.tail_meta_columns + self.num_columns]):
+                if value != Config.null_value and (
+                    self.index.has_index(column) or self.dictionaries[column] is not None
+                ):
+                    updated_data[column] = value
+                    tracked_columns[column] = 1
+            if any(tracked_columns):
+                current = self.get_projected_record(base_rid, tracked_columns)
+                prior_data = [
+                    current[Config.tail_meta_columns + column] if tracked else None
+                    for column, tracked in enumerate(tracked_columns)
+                ]
+
+        if self.dictionary_columns:
+            meta_columns = Config.tail_meta_columns if is_tail else Config.base_meta_columns
+            stored = self._encode_columns(columns, meta_columns)
+            rid = self.page_directory.add_record(stored, is_tail=is_tail, base_rid=base_rid)
+            columns[:meta_columns] = stored[:meta_columns]
+        else:
+            rid = self.page_directory.add_record(columns, is_tail=is_tail, base_rid=base_rid)
 
-        rid = self.page_directory.add_record(columns, is_tail=is_tail, base_rid=base_rid)
+        if is_tail and self.row_cache is not None:
+            self.row_cache.apply_update(
+                base_rid,
+                rid,
+                columns[Config.schema_encoding_column],
+                columns[Config.tail_meta_columns : Config.tail_meta_columns + self.num_columns],
+            )
 
         if not is_tail:
             base_data = columns[
                 Config.base_meta_columns : Config.base_meta_columns + self.num_columns
             ]
+            if self.row_cache is not None:
+                # The RID may be a reclaimed slot whose deleted record was cached.
+                self.row_cache.invalidate(rid)
             self.index.add(rid, base_data)
+            self._count_dictionary_values(base_data, 1)
         else:
-            updated_data = self.get_cumulative_updated_record(base_rid)[
-                Config.tail_meta_columns : Config.tail_meta_columns + self.num_columns
-            ]
-            self.index.update(base_rid, prior_data, updated_data)
+            if prior_data is not None:
+                self.index.update(base_rid, prior_data, updated_data)
+                self._count_dictionary_values(prior_data, -1)
+                self._count_dictionary_values(updated_data, 1)
+            range_id = self.page_directory.decode_rid(rid)[0]
+            if self.page_directory.needs_merge(range_id):
+                self.schedule_merge(range_id)
         return rid
 
+    def insert_records(self, rows: list[list[int]]):
+        """
+        Inserts a batch of base records into the table
+        :param rows: list[list[int]] - base records, each including meta columns
+        :return: list[int] - the RIDs of the records, in order
+        """
+        if self.dictionary_columns:
+            stored_rows = [self._encode_columns(columns, Config.base_meta_columns) for columns in rows]
+            rids = self.page_directory.add_records(stored_rows)
+            for columns, stored in zip(rows, stored_rows):
+                columns[: Config.base_meta_columns] = stored[: Config.base_meta_columns]
+        else:
+            rids = self.page_directory.add_records(rows)
+        data_rows = [columns[Config.base_meta_columns : Config.base_meta_columns + self.num_columns] for columns in rows]
+        self.index.add_batch(rids, data_rows)
+        for data in data_rows:
+            self._count_dictionary_values(data, 1)
+        return rids
+
+    def _count_dictionary_values(self, data: list[int], delta: int):
+        """
+        Adjusts the dictionary histograms for one version of a record's data columns
+        :param data: list[int] - the decoded data columns of the record, None for columns to leave alone
+        :param delta: int - +1 when the version becomes live, -1 when it is superseded or deleted
+        """
+        for column in self.dictionary_columns:
+            if data[column] is None:
+                continue
+            dictionary = self.dictionaries[column]
+            dictionary.record(dictionary.encode(data[column]), delta)
+
     def delete_record(self, rid: int):
         """
         Deletes a record from the table
@@ -349,19 +1564,75 @@ class Table:
         :return: bool - whether the record was deleted
         """
         try:
-            base_record = self.page_directory.get_record_from_rid(rid)
+            self.get_record(rid)
         except RuntimeError:
             return False
 
-        data_columns = base_record[Config.base_meta_columns : Config.base_meta_columns + self.num_columns]
-        self.index.remove(rid, data_columns)
+        # Indexes hold each record's latest values, so those are the entries to remove.
+        tracked_columns = [
+            1 if self.index.has_index(column) or self.dictionaries[column] is not None else 0
+            for column in range(self.num_columns)
+        ]
+        latest = self.get_projected_record(rid, tracked_columns)
+        latest_data = [
+            latest[Config.tail_meta_columns + column] if tracked else None
+            for column, tracked in enumerate(tracked_columns)
+        ]
+        self.index.remove(rid, latest_data)
 
         try:
-            return self.page_directory.delete_record(rid)
+            deleted = self.page_directory.delete_record(rid)
         except ValueError:
             return False
+        if self.row_cache is not None:
+            self.row_cache.invalidate(rid)
+        if deleted:
+            self._count_dictionary_values(latest_data, -1)
+        return deleted
+
+    def merge(self, range_id: int = None):
+        """
+        Merges committed tail records into the base pages, in the calling thread
+        :param range_id: int - the page range to merge, or None for every range
+        :return: int - the number of base logical pages that were replaced
+        """
+        range_ids = range(len(self.page_directory.page_directory)) if range_id is None else [range_id]
+        return sum(self.page_directory.merge_range(current_range) for current_range in range_ids)
+
+    def merge_partition(self, partition: int):
+        """
+        Merges every page range of one key-range partition, in the calling thread
+        :param partition: int - the partition index, see PageDirectory.partition_of
+        :return: int - the number of base logical pages that were replaced
+        """
+        range_ids = list(self.page_directory.partition_ranges[partition])
+        return sum(self.page_directory.merge_range(current_range) for current_range in range_ids)
+
+    def schedule_merge(self, range_id: int):
+        """
+        Starts a background merge of a range unless its partition is already merging
+        :param range_id: int - the page range to merge
+        :return: bool - whether a merge was started
+        """
+        partition = self.page_directory.range_partitions[range_id]
+        with self.merge_lock:
+            merge_thread = self.merge_threads.get(partition)
+            if merge_thread is not None and merge_thread.is_alive():
+                return False
+            merge_thread = Thread(target=self.__merge, args=(range_id,), daemon=True)
+            self.merge_threads[partition] = merge_thread
+            merge_thread.start()
+            return True
+
+    def wait_for_merge(self):
+        """
+        Blocks until every running background merge has finished
+        """
+        with self.merge_lock:
+            merge_threads = list(self.merge_threads.values())
+        for merge_thread in merge_threads:
+            merge_thread.join()
 
-    def __merge(self):
-        print("merge is happening")
-        pass
+    def __merge(self, range_id: int):
+        self.page_directory.merge_range(range_id)
  
@@ -1,11 +1,12 @@
 import sys
 from pathlib import Path
+from random import shuffle
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from lstore.bplus import BPlusTree
+from lstore.bplus import BPlusTree, PartitionedBPlusTree
 
 
 def test_insert_and_duplicate_values():
@@ -70,6 +71,90 @@ def test_remove_value_and_rebalance():
     assert tree.remove(2) is False
 
 
+def test_partitioned_tree_routes_keys_to_subtrees():
+    tree = PartitionedBPlusTree([100, 200], order=4)
+    for key in range(0, 300, 10):
+        tree.insert(key, key + 1)
+
+    assert [len(subtree) for subtree in tree.partitions] == [10, 10, 10]
+    assert tree.find(100) == [101]
+    assert tree.find(105) == []
+    assert tree.find_range(90, 110) == [91, 101, 111]
+    assert tree.find_range(250, 10_000) == [251, 261, 271, 281, 291]
+    assert tree.find_range(50, 40) == []
+    assert tree.remove(200, 201)
+    assert tree.find(200) == []
+    assert len(tree) == 29
+    assert [key for key, _ in tree.items()] == [key for key in range(0, 300, 10) if key != 200]
+
+
+def _check_structure(tree, node=None, low=None, high=None):
+    node = node or tree._root
+    assert node.keys == sorted(node.keys)
+    if node is not tree._root:
+        minimum = tree._min_leaf_keys if node.is_leaf() else tree._min_internal_keys
+        assert minimum <= len(node.keys) <= tree._max_keys
+    if low is not None:
+        assert all(key >= low for key in node.keys)
+    if high is not None:
+        assert all(key < high for key in node.keys)
+    if node.is_leaf():
+        return 1
+    assert len(node.children) == len(node.keys) + 1
+    assert all(child.parent is node for child in node.children)
+    bounds = [low] + node.keys + [high]
+    depths = {_check_structure(tree, child, bounds[i], bounds[i + 1]) for i, child in enumerate(node.children)}
+    assert len(depths) == 1
+    return depths.pop() + 1
+
+
+def test_bulk_load_builds_a_valid_packed_tree():
+    for count, fill_factor in ((0, 1.0), (3, 1.0), (1_000, 1.0), (1_001, 0.5), (5_000, 0.9)):
+        tree = BPlusTree(order=8)
+        tree.insert(-1, -1)
+        pairs = [(key // 2, key) for key in range(count)]
+        tree.bulk_load(pairs, fill_factor)
+
+        assert len(tree) == count
+        assert tree.find(-1) == []
+        _check_structure(tree)
+        assert list(tree.items()) == [(key, [2 * key, 2 * key + 1]) for key in range(count // 2)] + (
+            [(count // 2, [count - 1])] if count % 2 else []
+        )
+        assert tree.find_range(10, 20) == list(range(20, min(42, count)))
+
+        # The loaded tree keeps working under inserts and deletes.
+        for key in range(0, count // 2, 3):
+            assert tree.remove(key)
+        for key in range(count // 2, count // 2 + 50):
+            tree.insert(key, key)
+        _check_structure(tree)
+        assert len(tree) == count - 2 * len(range(0, count // 2, 3)) + 50
+
+    tree = PartitionedBPlusTree([10, 20], order=4)
+    tree.bulk_load([(key, key) for key in range(30)])
+    assert [len(subtree) for subtree in tree.partitions] == [10, 10, 10]
+    assert tree.find_range(5, 25) == list(range(5, 26))
+
+
+def test_duplicate_buckets_stay_sorted_and_distinct():
+    tree = BPlusTree(order=4)
+    rids = list(range(200))
+    shuffle(rids)
+    for rid in rids:
+        tree.insert(rid % 3, rid)
+        tree.insert(rid % 3, rid)
+    assert len(tree) == 200
+    assert tree.find(1) == list(range(1, 200, 3))
+
+    for rid in range(0, 200, 6):
+        assert tree.remove(0, rid)
+        assert not tree.remove(0, rid)
+    assert not tree.remove(2, 1)
+    assert tree.find(0) == list(range(3, 200, 6))
+    assert tree.find_range(0, 1) == list(range(3, 200, 6)) + list(range(1, 200, 3))
+
+
 if __name__ == "__main__":
     test_insert_and_duplicate_values()
     test_range_query_across_leaf_chain()
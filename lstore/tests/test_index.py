@@ -7,7 +7,8 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from config import Config
-from lstore.index import Index
+from lstore.index import Bitmap, BitmapIndex, HashIndex, Index
+from lstore.query import Query
 from lstore.table import Table
 
 
@@ -26,9 +27,9 @@ class FakeTable:
             rid: list(columns) for rid, columns in initial_rows
         }
 
-    def iter_rows_for_index(self) -> Iterable[Tuple[int, List[Optional[int]]]]:
+    def iter_rows_for_index(self, column: int) -> Iterable[Tuple[int, Optional[int]]]:
         for rid, columns in self._rows.items():
-            yield rid, list(columns)
+            yield rid, columns[column]
 
     def add_row(self, rid: int, columns: List[Optional[int]]) -> None:
         self._rows[rid] = list(columns)
@@ -108,6 +109,41 @@ def test_secondary_index_add_update_remove_and_drop():
     assert index.drop_index(0) is False
 
 
+def test_hash_index_serves_equality_lookups():
+    table = FakeTable(
+        num_columns=3,
+        key=0,
+        initial_rows=[
+            (1, [10, 100, 1000]),
+            (2, [20, 200, 2000]),
+            (3, [30, 200, 3000]),
+        ],
+    )
+    index = Index(table)
+
+    # The primary key answers point lookups from its hash index and ranges from its tree.
+    assert isinstance(index.hash_indices[0], HashIndex)
+    index.indices[0].find = None
+    assert index.locate(0, 20) == [2]
+    assert index.locate_range(15, 35, 0) == [2, 3]
+
+    assert index.create_index(1, "hash")
+    assert not index.create_index(1, "hash")
+    assert index.indices[1] is None
+    assert sorted(index.locate(1, 200)) == [2, 3]
+
+    index.update(3, [30, 200, 3000], [30, 250, 3000])
+    assert index.locate(1, 200) == [2]
+    assert index.locate(1, 250) == [3]
+    index.remove(2, [20, 200, 2000])
+    assert index.locate(1, 200) == []
+    assert index.locate_range(0, 1_000, 1) == [1, 3]
+    assert len(index.hash_indices[1]) == 2
+
+    assert index.drop_index(1)
+    assert index.hash_indices[1] is None
+
+
 def _insert_base_record(table: Table, primary_key: int, *data_columns: int) -> int:
     base_meta = [Config.null_value for _ in range(Config.base_meta_columns)]
     payload = list(data_columns)
@@ -168,6 +204,70 @@ def test_secondary_index_with_real_table_and_mutations():
     assert rid_map[101] not in index.locate(1, 900)
 
 
+
+def test_index_build_reads_latest_values_across_ranges():
+    table = Table("grades", num_columns=3, key=0)
+    query = Query(table)
+    count = Config.records_per_range + Config.records_per_page
+    rows = {key: [key, key % 7, key % 11] for key in range(count)}
+    table.insert_records([[Config.null_value] * Config.base_meta_columns + row for row in rows.values()])
+    for key in range(0, count, 5):
+        rows[key][1] = 100 + key % 3
+        assert query.update(key, None, rows[key][1], None)
+    for key in range(0, count, 9):
+        assert query.delete(key)
+        del rows[key]
+
+    rids = {key: table.index.locate(0, key)[0] for key in rows}
+    assert len({table.page_directory.decode_rid(rid)[0] for rid in rids.values()}) == 2
+    assert sorted(table.iter_rows_for_index(1)) == sorted((rids[key], row[1]) for key, row in rows.items())
+
+    assert table.index.create_index(1)
+    for value in (3, 100, 102):
+        assert sorted(table.index.locate(1, value)) == sorted(rids[key] for key, row in rows.items() if row[1] == value)
+    assert table.index.create_index(2, "hash")
+    assert sorted(table.index.locate(2, 4)) == sorted(rids[key] for key, row in rows.items() if row[2] == 4)
+
+
+
+def test_bitmap_indexes_combine_low_cardinality_predicates():
+    table = Table("grades", num_columns=3, key=0)
+    query = Query(table)
+    count = Config.records_per_page * 4
+    rows = {key: [key, key % 4, key % 21] for key in range(count)}
+    table.insert_records([[Config.null_value] * Config.base_meta_columns + row for row in rows.values()])
+    assert table.index.create_index(1, "bitmap")
+    assert table.index.create_index(2, "bitmap")
+    assert isinstance(table.index.bitmap_indices[1], BitmapIndex)
+
+    for key in range(0, count, 7):
+        rows[key][2] = 20
+        assert query.update(key, None, None, 20)
+    for key in range(0, count, 10):
+        assert query.delete(key)
+        del rows[key]
+    rids = {key: table.index.locate(0, key)[0] for key in rows}
+
+    def expected(status, low, high):
+        return sorted(rids[key] for key, row in rows.items() if row[1] == status and low <= row[2] <= high)
+
+    assert table.index.locate(1, 3) == sorted(rids[key] for key, row in rows.items() if row[1] == 3)
+    assert table.index.locate_range(18, 20, 2) == sorted(rids[key] for key, row in rows.items() if row[2] >= 18)
+    assert table.index.locate_all([(1, 2, 2), (2, 15, 20)]) == expected(2, 15, 20)
+    assert table.index.count([(1, 2, 2), (2, 15, 20)]) == len(expected(2, 15, 20))
+    # Columns without a bitmap index take part through their other index.
+    assert table.index.locate_all([(0, 100, 300), (1, 1, 1)]) == sorted(
+        rids[key] for key, row in rows.items() if 100 <= key <= 300 and row[1] == 1
+    )
+    assert table.index.count([(1, 0, 0), (1, 1, 1)]) == 0
+
+    bitmap = Bitmap.from_rids([5, 700, 701])
+    assert 700 in bitmap and 6 not in bitmap
+    assert bitmap.discard(700) and not bitmap.discard(700)
+    assert (bitmap | Bitmap.from_rids([3])).rids() == [3, 5, 701]
+    assert len(bitmap & Bitmap.from_rids([5, 6])) == 1
+
+
 if __name__ == "__main__":
     test_primary_index_bulk_load_and_lookup()
     test_secondary_index_add_update_remove_and_drop()
@@ -1,7 +1,7 @@
 import pytest
 
 from config import Config
-from lstore.page import Page
+from lstore.page import EncodedPage, Page, TailPage, buffer_pool
 
 
 def test_page_init():
@@ -57,8 +57,20 @@ def test_page_read_range():
     for value in range(5):
         page.write(value * 10)
 
-    assert page.read_range(2, 4) == [20, 30]
-    assert page.read_range(0) == [0, 10, 20, 30, 40]
+    assert page.read_range(2, 4).tolist() == [20, 30]
+    assert page.read_range(0).tolist() == [0, 10, 20, 30, 40]
+
+
+def test_page_read_range_is_zero_copy_view():
+    page = Page()
+
+    for value in range(5):
+        page.write(value)
+
+    view = page.read_range(1, 4)
+    assert isinstance(view, memoryview)
+    page.write_slot(2, 99)
+    assert view.tolist() == [1, 99, 3]
 
 
 def test_page_read_range_max_slots():
@@ -68,9 +80,9 @@ def test_page_read_range_max_slots():
         page.write(value)
 
     assert not page.has_capacity()
-    assert page.read_range() == list(range(Config.records_per_page))
-    assert page.read_range(start=1, end=3) == [1, 2]
-    assert page.read_range(0) == list(range(Config.records_per_page))
+    assert page.read_range().tolist() == list(range(Config.records_per_page))
+    assert page.read_range(start=1, end=3).tolist() == [1, 2]
+    assert page.read_range(0).tolist() == list(range(Config.records_per_page))
 
 
 def test_page_write_read_negative():
@@ -100,9 +112,9 @@ def test_page_read_range_edge_cases():
     for value in range(5):
         page.write(value * 10)
 
-    assert page.read_range(2, 2) == []
-    assert page.read_range(0, 0) == []
-    assert page.read_range(5, 5) == []
+    assert page.read_range(2, 2).tolist() == []
+    assert page.read_range(0, 0).tolist() == []
+    assert page.read_range(5, 5).tolist() == []
 
     with pytest.raises(IndexError):
         page.read_range(2, 1)
@@ -112,3 +124,116 @@ def test_page_read_range_edge_cases():
         page.read_range(2, 10)
     with pytest.raises(IndexError):
         page.read_range(10, 2)
+
+
+def test_page_write_many_fills_to_capacity():
+    page = Page()
+    page.write(7)
+
+    written = page.write_many(list(range(Config.records_per_page)))
+    assert written == Config.records_per_page - 1
+    assert page.num_records == Config.records_per_page
+    assert page.read(0) == 7
+    assert page.read(1) == 0
+    assert page.read(Config.records_per_page - 1) == Config.records_per_page - 2
+    assert page.write_many([1, 2, 3]) == 0
+
+
+def test_page_zone_map_tracks_writes_and_overwrites():
+    page = Page()
+    assert page.zone_map() == (None, None, 0, 0)
+
+    page.write(5)
+    page.write(Config.null_value)
+    page.write_many([-3, 12])
+    assert page.zone_map() == (-3, 12, 3, 14)
+
+    page.write_slot(3, 4)
+    assert page.zone_map() == (-3, 5, 3, 6)
+
+    page.write_slot(1, 20)
+    page.write_slot(2, Config.null_value)
+    assert page.zone_map() == (4, 20, 3, 29)
+
+
+def test_encoded_page_picks_compact_encodings():
+    grades = [value % 101 for value in range(Config.records_per_page)]
+    rids = list(range(5_000, 5_000 + Config.records_per_page))
+    timestamps = [1_700_000_000] * 300 + [1_700_000_001] * (Config.records_per_page - 300)
+
+    cases = {"for": grades, "delta": rids, "rle": timestamps}
+    for encoding, values in cases.items():
+        page = Page()
+        page.write_many(values)
+        encoded = EncodedPage.from_page(page)
+
+        assert encoded.encoding == encoding
+        assert encoded.nbytes < page.nbytes
+        assert encoded.decode() == values
+        assert [encoded.read(slot) for slot in range(len(values))] == values
+        assert encoded.read_range(3, 9) == values[3:9]
+        assert encoded.zone_map() == page.zone_map()
+
+
+def test_encoded_page_handles_nulls_and_extremes():
+    values = [Config.null_value, 2**63 - 1, 0, -5] * (Config.records_per_page // 4)
+    encoded = EncodedPage(values)
+
+    assert encoded.decode() == values
+    assert encoded.read(1) == 2**63 - 1
+    assert encoded.zone_map() == (-5, 2**63 - 1, len(values) * 3 // 4, (2**63 - 6) * (len(values) // 4))
+
+
+def test_encoded_page_is_read_only():
+    encoded = EncodedPage([1, 2, 3])
+
+    assert not encoded.has_capacity()
+    assert encoded.write(4) is False
+    with pytest.raises(RuntimeError):
+        encoded.write_slot(0, 9)
+    with pytest.raises(IndexError):
+        encoded.read(3)
+
+
+def test_tail_page_stores_only_updated_values():
+    tail_page = TailPage(Config.tail_meta_columns)
+    meta = list(range(Config.tail_meta_columns))
+
+    assert tail_page.append(meta, [7]) == 0
+    assert tail_page.append(meta, []) == 1
+    assert tail_page.append(meta, list(range(Config.records_per_page))) == 2
+    assert tail_page.append(meta, [8, 9]) == 3
+
+    assert tail_page.read_meta(3) == meta
+    assert tail_page.read_values(0) == [7]
+    assert tail_page.read_values(1) == []
+    assert tail_page.read_values(2) == list(range(Config.records_per_page))
+    assert tail_page.read_values(3) == [8, 9]
+    assert tail_page.num_values == Config.records_per_page + 3
+    assert len(tail_page.value_pages) == 2
+    assert tail_page.read_value(0, 0) == 7
+    assert tail_page.read_value(2, Config.records_per_page - 1) == Config.records_per_page - 1
+    assert tail_page.read_value(3, 1) == 9
+
+
+def test_page_allocates_lazily_and_recycles_buffers():
+    page = Page()
+    assert page.nbytes == 0
+    assert page.read_range().tolist() == []
+    assert page.zone_map() == (None, None, 0, 0)
+
+    page.write(3)
+    slots = page.slots
+    assert page.nbytes == Config.page_size
+
+    free_before = len(buffer_pool)
+    page.release()
+    assert len(buffer_pool) == free_before + 1
+    assert page.num_records == 0 and page.nbytes == 0
+    assert page.zone_map() == (None, None, 0, 0)
+
+    reused = Page()
+    reused.write(4)
+    assert reused.slots is slots
+    assert reused.read_range().tolist() == [4]
+    assert len(buffer_pool) == free_before
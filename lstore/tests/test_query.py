@@ -2,8 +2,12 @@
 
 from random import randint, sample, seed
 
+import pytest
+
 from config import Config
+from lstore.clock import commit_clock
 from lstore.db import Database
+from lstore.page import EncodedPage, buffer_pool
 from lstore.query import Query
 
 
@@ -77,10 +81,453 @@ def test_query_deletion_tombstone_behavior():
         range_id = key // Config.records_per_range
         page_index = (key // Config.records_per_page) % Config.pages_per_range
         slot_index = key % Config.records_per_page
-        indirection_page = table.page_directory.page_directory[range_id]["base"][page_index][
+        indirection_page = table.page_directory.page_directory[range_id][Config.base_segment][page_index][
             Config.indirection_column
         ]
         assert indirection_page.read(slot_index) == Config.deleted_record_value
 
     survivors = query.select(1, 0, [1, 1, 1, 1, 1])
     assert len(survivors) == 1
+
+
+def test_query_sum_uses_zone_maps_and_sees_updates():
+    table, query = _make_grades_table()
+    total_records = Config.records_per_page * 3
+
+    for key in range(total_records):
+        assert query.insert(key, key % 11, 1, 2, 3)
+
+    start, end = 10, Config.records_per_page * 2 + 20
+    expected = sum(key % 11 for key in range(start, end + 1))
+    assert query.sum(start, end, 1) == expected
+
+    # The fully covered middle page is answered from its zone map while clean.
+    directory = table.page_directory
+    zone = directory.get_zone_map(0, 1, Config.base_meta_columns + 1)
+    assert zone.count == Config.records_per_page
+    _, _, answered_pages, complete = table.sum_from_zone_maps(start, end, 1)
+    assert answered_pages == {(0, 1)}
+    assert not complete
+
+    middle_key = Config.records_per_page + 5
+    assert query.update(middle_key, None, 100, None, None, None)
+    expected += 100 - middle_key % 11
+    assert query.sum(start, end, 1) == expected
+
+    assert query.delete(middle_key + 1)
+    expected -= (middle_key + 1) % 11
+    assert query.sum(start, end, 1) == expected
+
+    assert query.sum(0, Config.records_per_page - 1, 3) == 2 * Config.records_per_page
+    assert query.sum(total_records + 10, total_records + 20, 1) is False
+
+
+def test_query_reads_through_compressed_base_pages():
+    table, query = _make_grades_table()
+    total_records = Config.records_per_page * 2 + 7
+
+    for key in range(total_records):
+        assert query.insert(1_000 + key, key % 101, 3, key, 0)
+
+    replaced = table.page_directory.compress_base_pages()
+    # Two full logical pages, read-only meta and data columns only.
+    assert replaced > 0
+    first_page = table.page_directory.page_directory[0][Config.base_segment][0]
+    assert not isinstance(first_page[Config.indirection_column], EncodedPage)
+    assert isinstance(first_page[Config.base_meta_columns + 1], EncodedPage)
+
+    assert query.update(1_005, None, 77, None, None, None)
+    assert query.select(1_005, 0, [1, 1, 1, 1, 1])[0].columns == [1_005, 77, 3, 5, 0]
+    assert query.select(1_006, 0, [1, 1, 1, 1, 1])[0].columns == [1_006, 6, 3, 6, 0]
+    expected = sum(key % 101 for key in range(total_records)) - 5 + 77
+    assert query.sum(1_000, 1_000 + total_records, 1) == expected
+    assert query.delete(1_010)
+    assert query.select(1_010, 0, [1, 1, 1, 1, 1]) == []
+
+
+def test_dictionary_encoded_columns_round_trip():
+    db = Database()
+    table = db.create_table("Grades", 5, 0, dictionary_columns=[1, 2])
+    query = Query(table)
+    grades = [900, 850, 700]
+
+    rows = {}
+    for key in range(Config.records_per_page + 10):
+        rows[key] = [key, grades[key % 3], grades[(key + 1) % 3], key * 2, 5]
+        assert query.insert(*rows[key])
+
+    # Pages hold dense codes, reads see the original values.
+    base_page = table.page_directory.page_directory[0][Config.base_segment][0]
+    assert base_page[Config.base_meta_columns + 1].read_range(0, 3).tolist() == [0, 1, 2]
+    assert query.select(4, 0, [1, 1, 1, 1, 1])[0].columns == rows[4]
+
+    dictionary = table.dictionaries[1]
+    assert dictionary.count(900) == len([row for row in rows.values() if row[1] == 900])
+    assert query.select(123, 1, [1, 1, 1, 1, 1]) == []
+    assert len(query.select(900, 1, [1, 1, 1, 1, 1])) == dictionary.count(900)
+
+    assert query.update(4, None, 123, None, None, None)
+    rows[4][1] = 123
+    assert dictionary.count(123) == 1
+    assert [record.rid for record in query.select(123, 1, [1, 1, 1, 1, 1])] == table.index.locate(0, 4)
+
+    for column in (1, 2):
+        expected = sum(row[column] for row in rows.values())
+        assert query.sum(0, len(rows), column) == expected
+        assert query.sum(Config.records_per_page, len(rows), column) == sum(
+            row[column] for key, row in rows.items() if key >= Config.records_per_page
+        )
+
+    assert query.delete(4)
+    assert dictionary.count(123) == 0
+    assert query.select(123, 1, [1, 1, 1, 1, 1]) == []
+
+
+def test_drop_table_returns_page_buffers_to_pool():
+    db = Database()
+    table = db.create_table("Grades", 5, 0)
+    query = Query(table)
+    for key in range(10):
+        assert query.insert(key, 1, 2, 3, 4)
+    assert query.update(3, None, 9, None, None, None)
+
+    free_before = len(buffer_pool)
+    assert db.drop_table("Grades")
+    # Nine base column pages, plus five tail meta, one offset and one value page.
+    assert len(buffer_pool) == free_before + 9 + 7
+
+
+def test_cumulative_tails_match_chained_tails():
+    db = Database()
+    chained = Query(db.create_table("Chained", 5, 0))
+    cumulative_table = db.create_table("Cumulative", 5, 0, cumulative_tails=True)
+    cumulative = Query(cumulative_table)
+    seed(3562901)
+
+    keys = list(range(100, 140))
+    for key in keys:
+        row = [key, randint(0, 20), randint(0, 20), randint(0, 20), randint(0, 20)]
+        assert chained.insert(*row)
+        assert cumulative.insert(*row)
+
+    for _ in range(300):
+        key = keys[randint(0, len(keys) - 1)]
+        updates = [None] * 5
+        updates[randint(1, 4)] = randint(0, 20)
+        assert chained.update(key, *updates)
+        assert cumulative.update(key, *updates)
+
+    for key in keys:
+        for version in (0, -1, -2, -5):
+            expected = chained.select_version(key, 0, [1, 1, 1, 1, 1], version)[0].columns
+            assert cumulative.select_version(key, 0, [1, 1, 1, 1, 1], version)[0].columns == expected
+        assert cumulative.sum(key, key, 3) == chained.sum(key, key, 3)
+
+    # The newest tail alone holds every column updated so far.
+    base_rid = cumulative_table.index.locate(0, keys[0])[0]
+    base_record = cumulative_table.get_record(base_rid)
+    newest_tail = cumulative_table.get_record(base_record[Config.indirection_column])
+    assert newest_tail[Config.schema_encoding_column] == base_record[Config.schema_encoding_column]
+
+
+def test_cumulative_tails_narrow_after_a_merge():
+    db = Database()
+    chained_table = db.create_table("Chained", 5, 0)
+    cumulative_table = db.create_table("Cumulative", 5, 0, cumulative_tails=True)
+    tables = (chained_table, cumulative_table)
+    queries = [Query(table) for table in tables]
+    for key in range(Config.records_per_page):
+        for query in queries:
+            assert query.insert(key, key, 0, 0, 0)
+
+    for column, value in ((1, 10), (2, 20)):
+        updates = [None] * 5
+        updates[column] = value
+        for query in queries:
+            assert query.update(7, *updates)
+    for table in tables:
+        table.merge()
+    for query in queries:
+        assert query.update(7, None, None, None, 30, None)
+        assert query.update(7, None, None, None, None, 40)
+
+    # The first tail after the merge carries only its own column, the next one adds to it.
+    base_rid = cumulative_table.index.locate(0, 7)[0]
+    tail_rids = cumulative_table.page_directory.version_tails[base_rid]
+    null = Config.null_value
+    assert cumulative_table.get_record(tail_rids[2])[Config.tail_meta_columns :] == [null, null, null, 30, null]
+    assert cumulative_table.get_record(tail_rids[3])[Config.tail_meta_columns :] == [null, null, null, 30, 40]
+    chained, cumulative = queries
+    for version in (0, -1, -2, -3, -4):
+        expected = chained.select_version(7, 0, [1, 1, 1, 1, 1], version)[0].columns
+        assert cumulative.select_version(7, 0, [1, 1, 1, 1, 1], version)[0].columns == expected
+    assert cumulative.select(7, 0, [1, 1, 1, 1, 1])[0].columns == [7, 10, 20, 30, 40]
+
+
+def test_row_cache_matches_uncached_reads():
+    db = Database()
+    plain = Query(db.create_table("Plain", 5, 0))
+    row_bytes = (Config.tail_meta_columns + 5) * Config.int_size
+    cached_table = db.create_table("Cached", 5, 0, dictionary_columns=[2], row_cache_bytes=16 * row_bytes)
+    cached = Query(cached_table)
+    seed(3562901)
+
+    keys = list(range(500, 560))
+    for key in keys:
+        row = [key, randint(0, 20), randint(0, 20), randint(0, 20), randint(0, 20)]
+        assert plain.insert(*row)
+        assert cached.insert(*row)
+
+    hot_keys = keys[:8]
+    for step in range(600):
+        key = hot_keys[randint(0, 7)] if step % 4 else keys[randint(0, len(keys) - 1)]
+        updates = [None] * 5
+        updates[randint(1, 4)] = randint(0, 20)
+        assert cached.update(key, *updates) == plain.update(key, *updates)
+        if step % 50 == 0:
+            plain.delete(key + 1)
+            cached.delete(key + 1)
+        projection = [1, 0, 1, 0, randint(0, 1)]
+        assert [r.columns for r in cached.select(key, 0, projection)] == [r.columns for r in plain.select(key, 0, projection)]
+
+    for key in keys:
+        assert [r.columns for r in cached.select(key, 0, [1] * 5)] == [r.columns for r in plain.select(key, 0, [1] * 5)]
+    assert cached.sum(keys[0], keys[-1], 3) == plain.sum(keys[0], keys[-1], 3)
+
+    row_cache = cached_table.row_cache
+    assert len(row_cache) == 16
+    assert row_cache.nbytes == 16 * row_bytes
+    assert row_cache.hits > row_cache.misses
+
+
+def test_update_maintains_indexes_without_reading_full_versions(monkeypatch):
+    table, query = _make_grades_table()
+    for key in range(20):
+        assert query.insert(key, key % 3, 0, 0, 0)
+    table.index.create_index(1)
+
+    projections = []
+    get_projected_record = table.get_projected_record
+
+    def recording_projection(rid, projected_columns):
+        projections.append(list(projected_columns))
+        return get_projected_record(rid, projected_columns)
+
+    monkeypatch.setattr(table, "get_projected_record", recording_projection)
+    monkeypatch.setattr(table, "get_cumulative_updated_record", None)
+
+    assert query.update(4, None, None, 9, None, None)
+    # Column 2 has no index, so only the tombstone check reads the record.
+    assert projections == [[0, 0, 0, 0, 0]]
+    assert query.update(4, None, 7, None, None, None)
+    assert projections[-1] == [0, 1, 0, 0, 0]
+    monkeypatch.undo()
+
+    assert table.index.locate(1, 7) == table.index.locate(0, 4)
+    assert table.index.locate(0, 4)[0] not in table.index.locate(1, 4 % 3)
+    assert query.select(4, 0, [1, 1, 1, 1, 1])[0].columns == [4, 7, 9, 0, 0]
+
+
+def test_select_and_sum_as_of_commit_timestamps():
+    table, query = _make_grades_table()
+    before_inserts = commit_clock.now()
+    for key in range(10):
+        assert query.insert(key, key, 0, 0, 0)
+    after_inserts = commit_clock.now()
+
+    snapshots = []
+    for step in range(40):
+        assert query.update(step % 10, None, None, step, None, None)
+        snapshots.append(commit_clock.now())
+    assert query.delete(3)
+    assert query.insert(10, 1, 0, 0, 0)
+
+    assert query.select_as_of(3, 0, [1, 1, 1, 1, 1], before_inserts) == []
+    assert query.select_as_of(3, 0, [1, 1, 1, 1, 1], after_inserts)[0].columns == [3, 3, 0, 0, 0]
+    assert query.select_as_of(3, 0, [1, 1, 1, 1, 1], snapshots[22])[0].columns == [3, 3, 13, 0, 0]
+    assert query.select_as_of(3, 0, [1, 1, 1, 1, 1], commit_clock.now()) == []
+    assert query.select_as_of(3, 0, [1, 1, 1, 1, 1], snapshots[-1])[0].columns == [3, 3, 33, 0, 0]
+    assert [record.columns[0] for record in query.select_as_of(1, 1, [1, 0, 0, 0, 0], commit_clock.now())] == [1, 10]
+    assert [record.columns[0] for record in query.select_as_of(1, 1, [1, 0, 0, 0, 0], snapshots[0])] == [1]
+
+    assert query.sum_as_of(0, 20, 2, before_inserts) is False
+    assert query.sum_as_of(0, 20, 2, after_inserts) == 0
+    assert query.sum_as_of(0, 20, 2, snapshots[9]) == sum(range(10))
+    assert query.sum_as_of(0, 20, 2, snapshots[-1]) == sum(range(30, 40))
+    assert query.sum_as_of(0, 20, 2, commit_clock.now()) == sum(range(30, 40)) - 33
+
+    timestamps = [table.get_record(rid)[Config.timestamp_column] for rid in table.page_directory.iter_base_rids()]
+    assert timestamps == sorted(set(timestamps))
+
+
+def test_as_of_key_lookups_follow_key_updates():
+    db = Database()
+    table = db.create_table("Grades", 3, 0)
+    query = Query(table)
+    for key in range(1, 5):
+        assert query.insert(key, key * 10, 0)
+    assert query.delete(4)
+    before_update = commit_clock.now()
+
+    # Deleted records only join a lookup when their key is in range.
+    assert [record.columns for record in query.select_as_of(4, 0, [1, 1, 1], before_update)] == []
+    assert query.sum_as_of(1, 3, 1, before_update) == 60
+
+    assert query.update(1, 6, None, None)
+    assert table.page_directory.key_updated
+    assert [record.columns for record in query.select_as_of(1, 0, [1, 1, 1], before_update)] == [[1, 10, 0]]
+    assert query.sum_as_of(1, 1, 1, before_update) == 10
+    assert query.select_as_of(1, 0, [1, 1, 1], commit_clock.now()) == []
+    assert [record.columns for record in query.select_as_of(6, 0, [1, 1, 1], commit_clock.now())] == [[6, 10, 0]]
+    assert query.sum_as_of(5, 6, 1, commit_clock.now()) == 10
+
+
+def test_as_of_reads_refuse_times_before_reclaimed_deletes():
+    table, query = _make_grades_table()
+    for key in range(Config.records_per_page):
+        assert query.insert(key, key, 0, 0, 0)
+    assert query.update(3, None, None, 7, None, None)
+    before_delete = commit_clock.now()
+    assert query.delete(3)
+    after_delete = commit_clock.now()
+    assert query.select_as_of(3, 0, [1, 1, 1, 1, 1], before_delete)[0].columns == [3, 3, 7, 0, 0]
+
+    # Reclaiming the deleted record drops its history, so earlier reads cannot be answered.
+    table.merge()
+    assert table.page_directory.free_slots[0]
+    assert query.select_as_of(3, 0, [1, 1, 1, 1, 1], before_delete) is False
+    assert query.sum_as_of(0, 10, 2, before_delete) is False
+    assert query.select_as_of(3, 0, [1, 1, 1, 1, 1], after_delete) == []
+    assert query.sum_as_of(0, 10, 2, after_delete) == 0
+
+
+def test_partitioned_table_keeps_partitions_apart(monkeypatch):
+    db = Database()
+    table = db.create_table("Grades", 5, 0, partition_bounds=[1_000, 2_000])
+    query = Query(table)
+    directory = table.page_directory
+    seed(3562901)
+
+    keys = sample(range(0, 3_000), Config.records_per_page * 3)
+    rows = {key: [key, randint(0, 20), randint(0, 20), 0, 0] for key in keys}
+    for key in keys[: Config.records_per_page]:
+        assert query.insert(*rows[key])
+    batch = keys[Config.records_per_page :]
+    table.insert_records([[Config.null_value] * Config.base_meta_columns + rows[key] for key in batch])
+
+    # Every range only holds keys of the partition that owns it.
+    for partition, range_ids in enumerate(directory.partition_ranges):
+        assert range_ids
+        for range_id in range_ids:
+            assert directory.range_partitions[range_id] == partition
+            for _, _, logical_page in directory.iter_base_pages([range_id]):
+                for key in logical_page[Config.base_meta_columns].decode():
+                    assert directory.partition_of(key) == partition
+    assert [len(subtree) for subtree in table.index.indices[0].partitions] == [
+        len([key for key in keys if directory.partition_of(key) == partition]) for partition in range(3)
+    ]
+
+    visited = []
+    iter_base_pages = directory.iter_base_pages
+    monkeypatch.setattr(
+        directory, "iter_base_pages", lambda range_ids=None: visited.extend(range_ids) or iter_base_pages(range_ids)
+    )
+    assert query.sum(1_200, 1_700, 1) == sum(row[1] for key, row in rows.items() if 1_200 <= key <= 1_700)
+    assert set(visited) == set(directory.partition_ranges[1])
+    monkeypatch.undo()
+
+    for key in keys[:50]:
+        assert query.update(key, None, None, None, 7, None)
+        rows[key][3] = 7
+    table.merge_partition(directory.partition_of(keys[0]))
+    for key in keys[:50]:
+        assert query.select(key, 0, [1, 1, 1, 1, 1])[0].columns == rows[key]
+
+
+def test_partitioned_table_rejects_key_updates_across_partitions():
+    db = Database()
+    table = db.create_table("Grades", 3, 0, partition_bounds=[100])
+    query = Query(table)
+    assert query.insert(5, 1, 1)
+    assert query.insert(150, 2, 2)
+
+    # Moving a key into another partition would leave it in a range the sum prunes away.
+    assert query.update(5, 120, None, None) is False
+    assert query.select(5, 0, [1, 1, 1])[0].columns == [5, 1, 1]
+    assert query.select(120, 0, [1, 1, 1]) == []
+    assert table.page_directory.version_count(table.index.locate(0, 5)[0]) == 0
+    assert query.sum(100, 200, 1) == 2
+
+    assert query.update(5, 50, None, None)
+    assert query.sum(0, 99, 1) == 1
+    assert query.select(50, 0, [1, 1, 1])[0].columns == [50, 1, 1]
+
+
+def test_partitioned_batch_insert_checks_every_row_first():
+    db = Database()
+    table = db.create_table("Grades", 3, 0, partition_bounds=[100])
+    query = Query(table)
+    meta = [Config.null_value] * Config.base_meta_columns
+    with pytest.raises(ValueError):
+        table.insert_records([meta + [1, 1, 1], meta + [2, 2, 2], meta + [150, 3, 3, 99]])
+    assert table.page_directory.num_base_records == 0
+    assert query.sum(0, 10, 1) is False
+    assert list(table.scan([0])) == []
+
+    rids = table.insert_records([meta + [1, 1, 1], meta + [150, 3, 3], meta + [2, 2, 2]])
+    assert len({table.get_record(rid)[Config.timestamp_column] for rid in rids}) == 1
+    assert query.sum(0, 200, 1) == 6
+
+
+def test_scan_key_pushdown_finds_updated_keys():
+    db = Database()
+    table = db.create_table("Grades", 3, 0, partition_bounds=[100])
+    query = Query(table)
+    assert query.insert(5, 1, 1)
+    assert query.insert(150, 2, 2)
+    assert query.update(5, 120, None, None) is False
+    assert [values for _, values in table.scan([0, 1], [(0, "==", 120)])] == []
+
+    assert query.update(5, 50, None, None)
+    assert [values for _, values in table.scan([0, 1], [(0, "==", 50)])] == [[[50], [1]]]
+    assert [values for _, values in table.scan([0, 1], [(0, "<", 100)])] == [[[50], [1]]]
+    assert [values for _, values in table.scan([0], [(0, "==", 5)])] == []
+
+
+def test_scan_filters_latest_values_page_by_page():
+    db = Database()
+    table = db.create_table("Grades", 5, 0, dictionary_columns=[4])
+    query = Query(table)
+    seed(3562901)
+
+    rows = {
+        key: [key, randint(0, 20), randint(0, 20), randint(0, 20), randint(0, 3) * 1_000]
+        for key in range(Config.records_per_page * 3)
+    }
+    for row in rows.values():
+        assert query.insert(*row)
+    for key in sample(sorted(rows), 300):
+        rows[key][1] = randint(0, 20)
+        rows[key][4] = randint(0, 3) * 1_000
+        assert query.update(key, None, rows[key][1], None, None, rows[key][4])
+    table.merge()
+    for key in sample(sorted(rows), 100):
+        rows[key][2] = randint(0, 20)
+        assert query.update(key, None, None, rows[key][2], None, None)
+    for key in sample(sorted(rows), 50):
+        assert query.delete(key)
+        del rows[key]
+
+    predicate = [(1, ">=", 10), (2, "!=", 5), (4, "==", 2_000)]
+    expected = sorted(
+        [key, row[4], row[2]]
+        for key, row in rows.items()
+        if row[1] >= 10 and row[2] != 5 and row[4] == 2_000
+    )
+    batches = list(table.scan([0, 4, 2], predicate, batch_size=7))
+    assert all(len(rids) == len(values[0]) <= 7 for rids, values in batches)
+    assert sorted(list(record) for _, values in batches for record in zip(*values)) == expected
+
+    # Keys outside the pages' zone maps match nothing, and every live row is scanned.
+    assert list(table.scan([0], [(0, ">", Config.records_per_page * 3)])) == []
+    assert sorted(key for _, values in table.scan([0]) for key in values[0]) == sorted(rows)
@@ -2,6 +2,7 @@ import pytest
 from random import randint, seed, sample
 
 from config import Config
+from lstore.page import EncodedPage
 from lstore.table import Table
 
 
@@ -60,7 +61,7 @@ def test_delete_record():
         page_index = (record_index // Config.records_per_page) % Config.pages_per_range
         slot_index = record_index % Config.records_per_page
 
-        indirection_page = page_directory.page_directory[range_id]["base"][page_index][Config.indirection_column]
+        indirection_page = page_directory.page_directory[range_id][Config.base_segment][page_index][Config.indirection_column]
         assert indirection_page.read(slot_index) == Config.deleted_record_value
 
     assert not grades_table.delete_record(0)
@@ -112,24 +113,28 @@ def test_insert_tail_record():
         grades_table.insert_record(secondary_tail, is_tail=True, base_rid=base_rid)
 
 
-def test_tail_range_capacity_limit():
+def test_tail_records_open_new_segments():
     grades_table = Table("grades", num_columns=5, key=0)
+    page_directory = grades_table.page_directory
     base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+    tail_meta_template = [Config.null_value for _ in range(Config.tail_meta_columns)]
 
     base_record = base_meta_template + [42] + [0 for _ in range(grades_table.num_columns - 1)]
     base_rid = grades_table.insert_record(base_record, is_tail=False)
 
-    # Fill all tail slots in the base range.
-    for tail_index in range(Config.records_per_range):
-        tail_record = base_meta_template + [-1] + [42] + [tail_index for _ in range(grades_table.num_columns - 1)]
-        tail_record[Config.base_rid_column] = base_rid
-        grades_table.insert_record(tail_record, is_tail=True, base_rid=base_rid)
-
-    overflowing_tail = base_meta_template + [-1] + [42] + [99 for _ in range(grades_table.num_columns - 1)]
-    overflowing_tail[Config.base_rid_column] = base_rid
+    # Fill the first tail segment of the range and spill into a second one.
+    for tail_index in range(Config.records_per_range + 1):
+        tail_record = tail_meta_template + [Config.null_value] + [tail_index for _ in range(grades_table.num_columns - 1)]
+        tail_rid = grades_table.insert_record(tail_record, is_tail=True, base_rid=base_rid)
 
-    with pytest.raises(RuntimeError):
-        grades_table.insert_record(overflowing_tail, is_tail=True, base_rid=base_rid)
+    assert page_directory.decode_rid(tail_rid) == (0, Config.tail_segment + 1, 0, 0)
+    assert page_directory.tail_sequence(tail_rid) == Config.records_per_range
+    assert page_directory.get_tail_page(0, Config.records_per_range)[0] is page_directory.page_directory[0][Config.tail_segment + 1][0]
+    assert len(list(page_directory.iter_tail_pages(0))) == Config.pages_per_range + 1
+    assert grades_table.get_record(tail_rid)[Config.tail_meta_columns :] == [Config.null_value] + [Config.records_per_range] * 4
+    latest = grades_table.get_cumulative_updated_record(base_rid)
+    assert latest[Config.tail_meta_columns :] == [42] + [Config.records_per_range] * 4
+    assert grades_table.get_relative_version_of_record(base_rid, 2)[Config.tail_meta_columns :] == [42] + [1] * 4
 
 
 def test_large_base_insert_spans_ranges():
@@ -153,3 +158,338 @@ def test_large_base_insert_spans_ranges():
         rid = grades_table.page_directory.encode_rid(range_id, 0, offset)
         record = grades_table.get_record(rid)
         assert record[Config.rid_column] == rid
+
+
+def test_insert_records_batch_matches_single_inserts():
+    batch_table = Table("grades", num_columns=5, key=0)
+    single_table = Table("grades", num_columns=5, key=0)
+    base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+
+    # Start mid-page and cross a range boundary to exercise chunking.
+    total_records = Config.records_per_range + Config.records_per_page // 2
+    rows = [
+        base_meta_template + [2_000_000 + i] + [i % 7 for _ in range(4)]
+        for i in range(total_records)
+    ]
+    batch_table.insert_record(list(rows[0]))
+    single_table.insert_record(list(rows[0]))
+
+    batch_rids = batch_table.insert_records([list(row) for row in rows[1:]])
+    single_rids = [single_table.insert_record(list(row)) for row in rows[1:]]
+
+    assert batch_rids == single_rids
+    assert batch_table.page_directory.num_base_records == total_records
+    for rid, row in zip(batch_rids, rows[1:]):
+        record = batch_table.get_record(rid)
+        assert record[Config.rid_column] == rid
+        assert record[Config.base_meta_columns :] == row[Config.base_meta_columns :]
+        assert batch_table.index.locate(0, row[Config.base_meta_columns]) == [rid]
+
+
+def test_sparse_tail_records_round_trip():
+    grades_table = Table("grades", num_columns=40, key=0)
+    base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+    tail_meta_template = [Config.null_value for _ in range(Config.tail_meta_columns)]
+
+    base_rid = grades_table.insert_record(base_meta_template + list(range(40)))
+    for column in range(1, 40):
+        tail_record = tail_meta_template + [Config.null_value] * 40
+        tail_record[Config.tail_meta_columns + column] = column * 100
+        tail_rid = grades_table.insert_record(tail_record, is_tail=True, base_rid=base_rid)
+
+        stored = grades_table.get_record(tail_rid)
+        assert stored[Config.tail_meta_columns :] == tail_record[Config.tail_meta_columns :]
+        assert stored[Config.schema_encoding_column] == 1 << (40 - column - 1)
+
+    latest = grades_table.get_cumulative_updated_record(base_rid)
+    assert latest[Config.tail_meta_columns :] == [0] + [column * 100 for column in range(1, 40)]
+
+    # One stored data value per single-column update instead of a full-width row.
+    tail_page = grades_table.page_directory.page_directory[0][Config.tail_segment][0]
+    assert tail_page.num_values == 39
+
+
+def test_rid_decoding_and_second_range_delete():
+    grades_table = Table("grades", num_columns=5, key=0)
+    page_directory = grades_table.page_directory
+
+    for range_id in (0, 3):
+        for segment in (Config.base_segment, Config.tail_segment):
+            for offset in (0, 1, Config.records_per_page + 7, Config.records_per_range - 1):
+                rid = page_directory.encode_rid(range_id, segment, offset)
+                assert rid == range_id * Config.range_cap + segment * Config.records_per_range + offset
+                assert page_directory.decode_rid(rid) == (
+                    range_id,
+                    segment,
+                    offset // Config.records_per_page,
+                    offset % Config.records_per_page,
+                )
+
+    base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+    rids = grades_table.insert_records(
+        [base_meta_template + [key, 0, 0, 0, 0] for key in range(Config.records_per_range + 1)]
+    )
+    second_range_rid = rids[-1]
+    assert page_directory.decode_rid(second_range_rid)[0] == 1
+    assert grades_table.delete_record(second_range_rid)
+    assert grades_table.get_record(second_range_rid)[Config.indirection_column] == Config.deleted_record_value
+
+
+def test_merge_folds_tails_into_base_pages(monkeypatch):
+    monkeypatch.setattr(Config, "merge_threshold", Config.records_per_range)
+    grades_table = Table("grades", num_columns=5, key=0)
+    page_directory = grades_table.page_directory
+    base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+    tail_meta_template = [Config.null_value for _ in range(Config.tail_meta_columns)]
+
+    rids = grades_table.insert_records(
+        [base_meta_template + [key, 7, 7, 7, 7] for key in range(Config.records_per_page)]
+    )
+    for step in range(3):
+        for key in range(0, Config.records_per_page, 4):
+            tail_record = tail_meta_template + [Config.null_value, key + step, Config.null_value, step, Config.null_value]
+            grades_table.insert_record(tail_record, is_tail=True, base_rid=rids[key])
+    expected = [grades_table.get_cumulative_updated_record(rid) for rid in rids]
+
+    monkeypatch.setattr(Config, "merge_threshold", 3 * Config.records_per_page // 4)
+    assert page_directory.needs_merge(0)
+    assert grades_table.merge() == 1
+    assert not page_directory.needs_merge(0)
+
+    merged_page = page_directory.page_directory[0][Config.base_segment][0]
+    assert merged_page.tps == page_directory.tail_offsets[0]
+    assert merged_page.original is not None
+    assert isinstance(merged_page[Config.base_meta_columns + 3], EncodedPage)
+    assert merged_page[Config.base_meta_columns + 2] is merged_page.original[Config.base_meta_columns + 2]
+    assert merged_page[Config.base_meta_columns + 1].read(4) == 6
+    assert [grades_table.get_cumulative_updated_record(rid) for rid in rids] == expected
+
+    # Merged records are answered from the base page without visiting any tail.
+    monkeypatch.setattr(page_directory, "get_tail_record", None)
+    assert grades_table.get_cumulative_updated_record(rids[4])[Config.tail_meta_columns :] == [4, 6, 7, 2, 7]
+    monkeypatch.undo()
+
+    # Older versions still replay over the values the record was inserted with.
+    assert grades_table.get_relative_version_of_record(rids[4], 0)[Config.tail_meta_columns :] == [4, 7, 7, 7, 7]
+    assert grades_table.get_relative_version_of_record(rids[4], 1)[Config.tail_meta_columns :] == [4, 4, 7, 0, 7]
+
+    # Updates after the merge are layered over the merged base.
+    tail_record = tail_meta_template + [Config.null_value, Config.null_value, 99, Config.null_value, Config.null_value]
+    grades_table.insert_record(tail_record, is_tail=True, base_rid=rids[4])
+    assert grades_table.get_cumulative_updated_record(rids[4])[Config.tail_meta_columns :] == [4, 6, 99, 2, 7]
+    assert grades_table.merge() == 1
+    assert grades_table.get_cumulative_updated_record(rids[4])[Config.tail_meta_columns :] == [4, 6, 99, 2, 7]
+
+
+def test_projected_fetch_reads_only_requested_columns(monkeypatch):
+    for cumulative in (False, True):
+        grades_table = Table("grades", num_columns=40, key=0, cumulative_tails=cumulative)
+        page_directory = grades_table.page_directory
+        base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+        tail_meta_template = [Config.null_value for _ in range(Config.tail_meta_columns)]
+
+        base_rid = grades_table.insert_record(base_meta_template + list(range(40)))
+        for step, column in enumerate((3, 17, 3, 39, 21)):
+            tail_record = tail_meta_template + [Config.null_value] * 40
+            tail_record[Config.tail_meta_columns + column] = column * 100 + step
+            grades_table.insert_record(tail_record, is_tail=True, base_rid=base_rid)
+
+        latest = grades_table.get_cumulative_updated_record(base_rid)
+        projection = [0] * 40
+        for column in (0, 3, 5, 39):
+            projection[column] = 1
+        projected = grades_table.get_projected_record(base_rid, projection)
+        assert projected[Config.indirection_column] == latest[Config.indirection_column]
+        assert projected[Config.tail_meta_columns :] == [
+            value if include else Config.null_value for value, include in zip(latest[Config.tail_meta_columns :], projection)
+        ]
+
+        # A column no tail has touched is answered from the base page alone.
+        monkeypatch.setattr(page_directory, "decode_rid", lambda rid, decode=page_directory.decode_rid: (
+            decode(rid) if rid == base_rid else pytest.fail("tail record visited")
+        ))
+        only_untouched = [0] * 40
+        only_untouched[5] = 1
+        assert grades_table.get_projected_record(base_rid, only_untouched)[Config.tail_meta_columns + 5] == 5
+        monkeypatch.undo()
+
+
+def test_get_records_matches_single_fetches():
+    for cumulative in (False, True):
+        grades_table = Table("grades", num_columns=5, key=0, cumulative_tails=cumulative)
+        base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+        tail_meta_template = [Config.null_value for _ in range(Config.tail_meta_columns)]
+        seed(3562901)
+
+        rids = grades_table.insert_records(
+            [base_meta_template + [key, 0, 0, 0, 0] for key in range(Config.records_per_page * 3)]
+        )
+        for _ in range(2000):
+            tail_record = tail_meta_template + [Config.null_value] * 5
+            tail_record[Config.tail_meta_columns + randint(1, 4)] = randint(0, 100)
+            grades_table.insert_record(tail_record, is_tail=True, base_rid=rids[randint(0, len(rids) - 1)])
+        grades_table.wait_for_merge()
+        assert grades_table.delete_record(rids[7])
+
+        wanted = sample(rids, 600) + [rids[7], rids[0], rids[0]]
+        for projection in ([1, 1, 1, 1, 1], [0, 0, 1, 0, 1], [0, 0, 0, 0, 0]):
+            assert grades_table.get_records(wanted, projection) == [
+                grades_table.get_projected_record(rid, projection) for rid in wanted
+            ]
+        assert grades_table.get_records([], [1, 1, 1, 1, 1]) == []
+
+
+def test_relative_versions_replay_from_checkpoints(monkeypatch):
+    grades_table = Table("grades", num_columns=5, key=0)
+    page_directory = grades_table.page_directory
+    base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+    tail_meta_template = [Config.null_value for _ in range(Config.tail_meta_columns)]
+    seed(3562901)
+
+    base_rid = grades_table.insert_record(base_meta_template + [1, 0, 0, 0, 0])
+    versions = [[1, 0, 0, 0, 0]]
+    for _ in range(1000):
+        tail_record = tail_meta_template + [Config.null_value] * 5
+        column = randint(1, 4)
+        tail_record[Config.tail_meta_columns + column] = randint(0, 1000)
+        grades_table.insert_record(tail_record, is_tail=True, base_rid=base_rid)
+        versions.append(list(versions[-1]))
+        versions[-1][column] = tail_record[Config.tail_meta_columns + column]
+
+    assert page_directory.version_count(base_rid) == 1000
+    assert len(page_directory.version_checkpoints[base_rid]) == 1000 // Config.version_checkpoint_interval
+
+    tail_reads = []
+    get_record_from_rid = page_directory.get_record_from_rid
+    monkeypatch.setattr(page_directory, "get_record_from_rid", lambda rid: tail_reads.append(rid) or get_record_from_rid(rid))
+    for version in (0, 1, 15, 16, 17, 999, 1000, 1200, -2, -3, -17, -1001):
+        tail_reads.clear()
+        expected = versions[max(0, 1000 + 1 + version)] if version < -1 else versions[min(version, 1000)]
+        record = grades_table.get_relative_version_of_record(base_rid, version)
+        assert record[Config.tail_meta_columns :] == expected
+        assert len(tail_reads) < Config.version_checkpoint_interval
+
+
+def test_merge_reclaims_deleted_records_for_reuse(monkeypatch):
+    monkeypatch.setattr(Config, "merge_threshold", Config.records_per_range)
+    grades_table = Table("grades", num_columns=5, key=0)
+    page_directory = grades_table.page_directory
+    base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+    tail_meta_template = [Config.null_value for _ in range(Config.tail_meta_columns)]
+
+    rids = grades_table.insert_records(
+        [base_meta_template + [key, key, 0, 0, 0] for key in range(Config.records_per_page * 2)]
+    )
+    # Every tail on the first tail page belongs to a record that is deleted below.
+    doomed = rids[: Config.records_per_page // 2]
+    for rid in doomed:
+        for value in (1, 2):
+            grades_table.insert_record(tail_meta_template + [Config.null_value, Config.null_value, value, 0, 0], True, rid)
+    grades_table.insert_record(tail_meta_template + [Config.null_value, Config.null_value, 5, 0, 0], True, rids[-1])
+    page_directory.compress_base_pages()
+    for rid in doomed:
+        assert grades_table.delete_record(rid)
+    assert page_directory.free_space(0) == 0
+
+    grades_table.merge()
+    assert page_directory.free_space(0) == len(doomed) * (Config.base_meta_columns + 5) * Config.int_size
+    assert page_directory.version_count(doomed[0]) == 0
+    first_tail_page = page_directory.page_directory[0][Config.tail_segment][0]
+    assert first_tail_page.num_records == 0 and first_tail_page.nbytes == 0
+    assert grades_table.get_cumulative_updated_record(rids[-1])[Config.tail_meta_columns :] == [len(rids) - 1, len(rids) - 1, 5, 0, 0]
+
+    # New inserts land in the reclaimed slots and read back like any other record.
+    reused_rid = grades_table.insert_record(base_meta_template + [10_000, 1, 2, 3, 4])
+    assert reused_rid in doomed
+    assert grades_table.index.locate(0, 10_000) == [reused_rid]
+    assert grades_table.get_cumulative_updated_record(reused_rid)[Config.tail_meta_columns :] == [10_000, 1, 2, 3, 4]
+    grades_table.insert_record(tail_meta_template + [Config.null_value, 9, Config.null_value, 0, 0], True, reused_rid)
+    assert grades_table.get_relative_version_of_record(reused_rid, 0)[Config.tail_meta_columns :] == [10_000, 1, 2, 3, 4]
+    assert grades_table.get_cumulative_updated_record(reused_rid)[Config.tail_meta_columns :] == [10_000, 9, 2, 0, 0]
+    grades_table.merge()
+    assert grades_table.get_cumulative_updated_record(reused_rid)[Config.tail_meta_columns :] == [10_000, 9, 2, 0, 0]
+    assert page_directory.free_space(0) == (len(doomed) - 1) * (Config.base_meta_columns + 5) * Config.int_size
+
+
+def test_insert_during_merge_skips_slots_of_pages_being_rebuilt(monkeypatch):
+    monkeypatch.setattr(Config, "merge_threshold", Config.records_per_range)
+    grades_table = Table("grades", num_columns=3, key=0)
+    page_directory = grades_table.page_directory
+    base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+    tail_meta_template = [Config.null_value for _ in range(Config.tail_meta_columns)]
+
+    rids = grades_table.insert_records([base_meta_template + [key, 3, 3] for key in range(Config.records_per_page)])
+    assert grades_table.delete_record(rids[0])
+    grades_table.merge()
+    assert page_directory.free_slots[0] == [rids[0]]
+
+    # An insert arriving while the page is rebuilt must not write into the old page.
+    grades_table.insert_record(tail_meta_template + [Config.null_value, 7, Config.null_value], True, rids[1])
+    build = page_directory._build_read_only_page
+    inserted = []
+
+    def build_and_insert(values, writable=False):
+        if not inserted:
+            inserted.append(grades_table.insert_record(base_meta_template + [1_000, 55, 56]))
+        return build(values, writable)
+
+    monkeypatch.setattr(page_directory, "_build_read_only_page", build_and_insert)
+    grades_table.merge()
+    assert inserted[0] != rids[0]
+    assert grades_table.get_cumulative_updated_record(inserted[0])[Config.tail_meta_columns :] == [1_000, 55, 56]
+    assert page_directory.free_slots[0] == [rids[0]]
+    assert grades_table.insert_record(base_meta_template + [1_001, 1, 2]) == rids[0]
+    assert grades_table.get_cumulative_updated_record(rids[0])[Config.tail_meta_columns :] == [1_001, 1, 2]
+
+
+def test_compression_during_merge_leaves_pages_being_rebuilt_alone(monkeypatch):
+    monkeypatch.setattr(Config, "merge_threshold", Config.records_per_range)
+    grades_table = Table("grades", num_columns=3, key=0)
+    page_directory = grades_table.page_directory
+    base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+    tail_meta_template = [Config.null_value for _ in range(Config.tail_meta_columns)]
+
+    rids = grades_table.insert_records([base_meta_template + [key, 1, 2] for key in range(Config.records_per_page)])
+    grades_table.insert_record(tail_meta_template + [Config.null_value, 9, Config.null_value], True, rids[5])
+    build = page_directory._build_read_only_page
+    compressed = []
+
+    def build_and_compress(values, writable=False):
+        if not compressed:
+            compressed.append(page_directory.compress_base_pages())
+        return build(values, writable)
+
+    monkeypatch.setattr(page_directory, "_build_read_only_page", build_and_compress)
+    grades_table.merge()
+    monkeypatch.undo()
+    assert compressed == [0]
+
+    # The next merge releases pages retired by this one; the merged page must not be among them.
+    grades_table.insert_record(tail_meta_template + [Config.null_value, 8, Config.null_value], True, rids[6])
+    monkeypatch.setattr(Config, "merge_threshold", Config.records_per_range)
+    grades_table.merge()
+    assert grades_table.get_cumulative_updated_record(rids[5])[Config.tail_meta_columns :] == [5, 9, 2]
+    assert grades_table.get_cumulative_updated_record(rids[7])[Config.tail_meta_columns :] == [7, 1, 2]
+
+
+def test_partial_page_tails_do_not_keep_scheduling_merges(monkeypatch):
+    monkeypatch.setattr(Config, "merge_threshold", 50)
+    grades_table = Table("grades", num_columns=3, key=0)
+    page_directory = grades_table.page_directory
+    base_meta_template = [Config.null_value for _ in range(Config.base_meta_columns)]
+    tail_meta_template = [Config.null_value for _ in range(Config.tail_meta_columns)]
+    merges = []
+    merge_range = page_directory.merge_range
+    monkeypatch.setattr(page_directory, "merge_range", lambda range_id: merges.append(range_id) or merge_range(range_id))
+
+    rids = grades_table.insert_records([base_meta_template + [key, 0, 0] for key in range(100)])
+    for step in range(1_000):
+        grades_table.insert_record(tail_meta_template + [Config.null_value, step, Config.null_value], True, rids[step % 100])
+        # Let each merge finish so every update that finds the threshold reached can start one.
+        grades_table.wait_for_merge()
+
+    # Only a page that is still filling has tails, so a merge is due once per threshold.
+    assert len(merges) == 1_000 // Config.merge_threshold
+    assert not page_directory.needs_merge(0)
+    assert grades_table.get_cumulative_updated_record(rids[7])[Config.tail_meta_columns :] == [7, 907, 0]
+